@@ -1,10 +1,9 @@
 """Python program that executes several consecutive
-RAMP commands, delaying the next RAMP command based on
-the estimated time to finish.
+RAMP commands, waiting for each RAMP command to reach
+its TSP before executing the next one.
 """
 
 import instec
-import time
 
 
 # Variables for setting up the controller
@@ -22,14 +21,15 @@ rt = [30.0, 50.0, 80.0, 20.0]      # In °C/minute
 
 # For each RT value:
 for rate in rt:
-    # Get current PV
-    pv = controller.get_process_variable()
     # RAMP to TSP value at specified RT
     controller.ramp(tsp[0], rate)
 
-    # Wait until RAMP is done by calculating the estimated time
-    # based on RT and the temperature delta, then execute next RAMP
-    time.sleep(abs((tsp[0] - pv) / rate * 60))
+    # Wait until RAMP is done, then execute next RAMP. The wait is
+    # estimated from RT and the temperature delta, and PV is only
+    # checked frequently near the TSP
+    stats = controller.wait_until_settled(tsp[0], tolerance=0.5,
+                                          stable_for=0)
+    print(f'Reached {tsp[0]} °C after {stats.elapsed:.1f} s')
 
     # Remove old TSP value
     tsp.pop(0)
@@ -15,4 +15,16 @@ for controller in controllers:
 
 for controller in controllers:
     controller.connect()
-    print(f'PV of Controller at IP {controller._controller._controller_address}: {controller.get_process_variable()}')
\ No newline at end of file
+    print(f'PV of Controller at IP {controller._controller._controller_address}: {controller.get_process_variable()}')
+
+# Poll the runtime information of all controllers at once
+with instec.ControllerPoller(controllers) as poller:
+    for controller, rtin in zip(controllers,
+                                poller.get_runtime_information()):
+        if rtin is None:
+            print(f'No response from controller at IP {controller._controller._controller_address}')
+        else:
+            print(f'PV of Controller at IP {controller._controller._controller_address}: {rtin[1]}')
+
+for controller in controllers:
+    controller.disconnect()
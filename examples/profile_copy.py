@@ -28,9 +28,11 @@ PRECISION = 0.1             # In °C or %
 # Select profile
 selected_profile = int(input('Select profile: '))
 
+# Read the whole profile at once
+profile = controller.read_profile(selected_profile)
+
 # Create and set filepath for new file
-name = controller.get_profile_name(selected_profile)
-name = name.strip().replace(' ', '_')
+name = profile.name.replace(' ', '_')
 base_path = 'profiles'
 file_name = f'copy_profile_{selected_profile}_{name}.py'
 file_path = os.path.join(base_path, file_name)
@@ -83,9 +85,7 @@ controller.set_profile_name('{name}')
 ''')
 # Iterate through all items in profile and add different functions to the file
 # depending on the item.
-for i in range(controller.get_profile_item_count(selected_profile)):
-    item = controller.get_profile_item(selected_profile, i)
-
+for item in profile.items:
     # Write commands to file
     file.write(f'''
 controller.add_profile_item(PROFILE, instec.{item[0]}, {item[1]}, {item[2]})''')
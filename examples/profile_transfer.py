@@ -31,8 +31,11 @@ PRECISION = 0.1             # In °C or %
 # Select profile
 selected_profile = int(input('Select profile: '))
 
+# Read the whole profile at once
+profile = controller.read_profile(selected_profile)
+
 # Create and set filepath for new file
-name = controller.get_profile_name(selected_profile).strip()
+name = profile.name
 name.replace(' ', '_')
 base_path = 'profiles'
 file_name = f'transfer_profile_{selected_profile}_{name}.py'
@@ -85,21 +88,16 @@ indent = ''
 
 # Iterate through all items in profile and add different functions to the file
 # depending on the item.
-for i in range(controller.get_profile_item_count(selected_profile)):
-    item = controller.get_profile_item(selected_profile, i)
+for i, item in enumerate(profile.items):
     commands = ('',)
     # Determine item instruction type and select commands accordingly
     match(item[0]):
         case instec.profile_item.HOLD:
             commands = (f'controller.hold({item[1]})',
-                        'pv = controller.get_process_variables()[controller.get_operating_slave()]',
-                        f'while abs(pv - {item[1]}) > {PRECISION}:',
-                        '    pv = controller.get_process_variables()[controller.get_operating_slave()]',)
+                        f'controller.wait_until_settled({item[1]}, {PRECISION}, stable_for=0)',)
         case instec.profile_item.RAMP:
             commands = (f'controller.ramp({item[1]}, {item[2]})',
-                        'pv = controller.get_process_variables()[controller.get_operating_slave()]',
-                        f'while abs(pv - {item[1]}) > {PRECISION}:',
-                        '    pv = controller.get_process_variables()[controller.get_operating_slave()]',)
+                        f'controller.wait_until_settled({item[1]}, {PRECISION}, stable_for=0)',)
         case instec.profile_item.WAIT:
             commands = (f'time.sleep({item[1] * 60})',)
         case instec.profile_item.LOOP_BEGIN:
@@ -0,0 +1,19 @@
+"""Asyncio implementation of the MK2000B SCPI command set.
+"""
+
+from instec.async_command import async_command
+from instec.MK2000B import MK2000B
+
+
+class AsyncMK2000B(async_command):
+    """MK2000B command set where every temperature, PID and profile
+    function is a coroutine, for example:
+
+        controller = instec.AsyncMK2000B(instec.mode.ETHERNET, ip=ip)
+        await controller.connect()
+        pv = await controller.get_process_variable()
+    """
+    _command_set = MK2000B
+    PID_INDEX_NUM = MK2000B.PID_INDEX_NUM
+    PROFILE_NUM = MK2000B.PROFILE_NUM
+    ITEM_NUM = MK2000B.ITEM_NUM
@@ -0,0 +1,19 @@
+"""Asyncio implementation of the MK2000VCP SCPI command set.
+"""
+
+from instec.async_command import async_command
+from instec.MK2000VCP import MK2000VCP
+
+
+class AsyncMK2000VCP(async_command):
+    """MK2000VCP command set where every temperature function is a
+    coroutine, for example:
+
+        controller = instec.AsyncMK2000VCP(instec.mode.ETHERNET, ip=ip)
+        await controller.connect()
+        pv = await controller.get_process_variable()
+    """
+    _command_set = MK2000VCP
+    PID_INDEX_NUM = MK2000VCP.PID_INDEX_NUM
+    PROFILE_NUM = MK2000VCP.PROFILE_NUM
+    ITEM_NUM = MK2000VCP.ITEM_NUM
@@ -1,11 +1,12 @@
 """MK2000B implementation for SCPI command set.
 """
 
-from ast import literal_eval
 from instec.temperature import temperature
 from instec.pid import pid
 from instec.profile import profile
 from instec.command import command
+from instec.records import DeviceInfo, ProfileItem, Profile
+from instec.parsers import parse
 from instec.constants import (temperature_mode, system_status,
                               unit, profile_status, pid_table,
                               profile_item)
@@ -17,6 +18,9 @@ class MK2000B(command, temperature, pid, profile):
     ITEM_NUM = 255
 
     def get_system_information(self):
+        if self._info is not None:
+            return (self._info.company, self._info.model,
+                    self._info.serial, self._info.firmware)
         data = self._controller._send_command('*IDN?').strip().split(',')
         company = data[0]
         model = data[1]
@@ -24,40 +28,40 @@ class MK2000B(command, temperature, pid, profile):
         firmware = data[3]
         return company, model, serial, firmware
 
+    def _get_device_info(self):
+        with self.batch() as b:
+            system = b.get_system_information()
+            serial = b.get_serial_number()
+            slave_count = b.get_slave_count()
+            precision = b.get_precision()
+            pv_unit = b.get_pv_unit_type()
+            mv_unit = b.get_mv_unit_type()
+            stage_range = b.get_stage_range()
+            default_range = b.get_default_operation_range()
+        company, model, _, firmware = system.result()
+        return DeviceInfo(company, model, serial.result(), firmware,
+                          slave_count.result(), precision.result(),
+                          pv_unit.result(), mv_unit.result(),
+                          stage_range.result(), default_range.result())
+
     def get_runtime_information(self):
-        rtin_raw = self._controller._send_command('TEMP:RTIN?')
-        rtin = (rtin_raw.split('MK')[1]).split(':')
-        sx = int(rtin[1])
-        pv = float(rtin[2])
-        mv = float(rtin[3])
-        tsp = float(rtin[4])
-        csp = float(rtin[5])
-        rt = float(rtin[6])
-        pp = float(rtin[7])
-        s_status = system_status(int(rtin[8]))
-        profile = rtin[9].split(',')
-        p_status = profile_status(int(profile[0]))
-        p = int(profile[1])
-        i = int(profile[2])
-        error_status = int(rtin[10])
-
-        return (sx, pv, mv, tsp, csp, rt, pp, s_status, p_status,
-                p, i, error_status)
-
-    def get_process_variables(self):
-        pv_raw = self._controller._send_command('TEMP:CTEM?')
-        pv = literal_eval(f'({pv_raw},)')
-        return pv
-
-    def get_monitor_values(self):
-        mv_raw = self._controller._send_command('TEMP:MTEM?')
-        mv = literal_eval(f'({mv_raw},)')
-        return mv
-
-    def get_protection_sensors(self):
-        ps_raw = self._controller._send_command('TEMP:PTEM?')
-        ps = literal_eval(f'({ps_raw},)')
-        return ps
+        return self._parse_runtime_information(
+            self._controller._send_command('TEMP:RTIN?'))
+
+    def _parse_runtime_information(self, rtin_raw: str):
+        return parse.runtime_information(rtin_raw)
+
+    def get_process_variables(self, out=None):
+        return parse.values(
+            self._controller._send_command('TEMP:CTEM?'), out)
+
+    def get_monitor_values(self, out=None):
+        return parse.values(
+            self._controller._send_command('TEMP:MTEM?'), out)
+
+    def get_protection_sensors(self, out=None):
+        return parse.values(
+            self._controller._send_command('TEMP:PTEM?'), out)
 
     def hold_check(self, tsp: float):
         if self.is_in_operation_range(tsp):
@@ -115,6 +119,7 @@ class MK2000B(command, temperature, pid, profile):
     def set_cooling_heating_status(self, status: temperature_mode):
         if isinstance(status, temperature_mode):
             self._controller._send_command(f'TEMP:CHSW {status.value}', False)
+            self._invalidate('cooling_heating_status')
         else:
             raise ValueError('Temperature mode is invalid')
 
@@ -129,6 +134,8 @@ class MK2000B(command, temperature, pid, profile):
         return max, min, limit_value, limit_max, limit_min
 
     def get_stage_range(self):
+        if self._info is not None:
+            return self._info.stage_range
         max, min = self._controller._send_command('TEMP:SRAN?').split(',')
         return float(max), float(min)
 
@@ -138,10 +145,11 @@ class MK2000B(command, temperature, pid, profile):
 
     def set_operation_range(self, max: float, min: float):
         if min <= max:
-            smax, smin = self.get_stage_range()
+            smax, smin = self._cached('stage_range', self.get_stage_range)
             if min >= smin and max <= smax:
                 self._controller._send_command(
                     f'TEMP:RANG {float(max)},{float(min)}', False)
+                self._invalidate('operation_range')
             else:
                 raise ValueError('Operation temperature range is out of '
                                  'stage temperature range')
@@ -149,6 +157,8 @@ class MK2000B(command, temperature, pid, profile):
             raise ValueError('max is smaller than min')
 
     def get_default_operation_range(self):
+        if self._info is not None:
+            return self._info.default_operation_range
         max, min = self._controller._send_command('TEMP:DRAN?').split(',')
         return float(max), float(min)
 
@@ -156,6 +166,8 @@ class MK2000B(command, temperature, pid, profile):
         return system_status(int(self._controller._send_command('TEMP:STAT?')))
 
     def get_serial_number(self):
+        if self._info is not None:
+            return self._info.serial
         return self._controller._send_command('TEMP:SNUM?').strip()
 
     def get_set_point_temperature(self):
@@ -179,10 +191,14 @@ class MK2000B(command, temperature, pid, profile):
     def set_operating_slave(self, slave: int):
         if slave >= 1 and slave <= self.get_slave_count():
             self._controller._send_command(f'TEMP:OPSL {int(slave)}', False)
+            if self._cache is not None:
+                self._cache['operating_slave'] = int(slave)
         else:
             raise ValueError('Invalid operating slave number')
 
     def get_slave_count(self):
+        if self._info is not None:
+            return self._info.slave_count
         return int(self._controller._send_command('TEMP:SLAV?'))
 
     def purge(self, delay: float, hold: float):
@@ -196,28 +212,35 @@ class MK2000B(command, temperature, pid, profile):
             raise ValueError('Delay is less than 0')
 
     def get_pv_unit_type(self):
+        if self._info is not None:
+            return self._info.pv_unit
         return unit(int(self._controller._send_command('TEMP:TCUN?')))
 
     def get_mv_unit_type(self):
+        if self._info is not None:
+            return self._info.mv_unit
         return unit(int(self._controller._send_command('TEMP:TMUN?')))
 
     def get_precision(self):
+        if self._info is not None:
+            return self._info.precision
         precision = self._controller._send_command('TEMP:PREC?').split(',')
         pv_precision = int(precision[0])
         mv_precision = int(precision[1])
         return pv_precision, mv_precision
 
     def get_process_variable(self):
-        return self.get_process_variables()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:CTEM?')
 
     def get_monitor_value(self):
-        return self.get_monitor_values()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:MTEM?')
 
     def get_protection_sensor(self):
-        return self.get_protection_sensors()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:PTEM?')
 
     def get_power_range(self):
-        status = self.get_cooling_heating_status()
+        status = self._cached('cooling_heating_status',
+                              self.get_cooling_heating_status)
         min = 0.0 if status == temperature_mode.HEATING_ONLY else -1.0
         max = 0.0 if status == temperature_mode.COOLING_ONLY else 1.0
         return max, min
@@ -227,11 +250,11 @@ class MK2000B(command, temperature, pid, profile):
         return pp >= min and pp <= max
 
     def is_in_ramp_rate_range(self, rt: float):
-        range = self.get_ramp_rate_range()
+        range = self._cached('ramp_rate_range', self.get_ramp_rate_range)
         return rt >= range[1] and rt <= range[0]
 
     def is_in_operation_range(self, temp: float):
-        max, min = self.get_operation_range()
+        max, min = self._cached('operation_range', self.get_operation_range)
         if temp >= min and temp <= max:
             return True
         else:
@@ -294,6 +317,8 @@ class MK2000B(command, temperature, pid, profile):
     def start_profile(self, p: int):
         if self.is_valid_profile(p):
             self._controller._send_command(f'PROF:STAR {p}', False)
+            # Profile items can change the cooling/heating mode
+            self._invalidate('cooling_heating_status')
         else:
             raise ValueError('Invalid profile')
 
@@ -382,26 +407,29 @@ class MK2000B(command, temperature, pid, profile):
     def get_profile_item(self, p: int, i: int):
         if self.is_valid_profile(p):
             if self.is_valid_item_index(i):
-                item_raw = self._controller._send_command(
-                    f'PROF:EDIT:IRE {p},{i}').split(',')
-                item = profile_item(int(item_raw[0]))
-                b1 = float(item_raw[1]) if (item in [
-                    profile_item.HOLD,
-                    profile_item.RPP,
-                    profile_item.WAIT,
-                    profile_item.LOOP_BEGIN,
-                    profile_item.RAMP,
-                    profile_item.PURGE]) else None
-                b2 = float(item_raw[2]) if (item in [
-                    profile_item.PURGE,
-                    profile_item.RAMP]) else None
-
-                return item, b1, b2
+                return self._parse_profile_item(self._controller._send_command(
+                    f'PROF:EDIT:IRE {p},{i}'))
             else:
                 raise ValueError('Invalid item index')
         else:
             raise ValueError('Invalid profile')
 
+    def _parse_profile_item(self, item_raw: str):
+        item_raw = item_raw.split(',')
+        item = profile_item(int(item_raw[0]))
+        b1 = float(item_raw[1]) if (item in [
+            profile_item.HOLD,
+            profile_item.RPP,
+            profile_item.WAIT,
+            profile_item.LOOP_BEGIN,
+            profile_item.RAMP,
+            profile_item.PURGE]) else None
+        b2 = float(item_raw[2]) if (item in [
+            profile_item.PURGE,
+            profile_item.RAMP]) else None
+
+        return ProfileItem(item, b1, b2)
+
     def set_profile_item(self, p: int, i: int, item: profile_item = None,
                          b1: float = None, b2: float = None):
         if self.is_valid_profile(p):
@@ -470,6 +498,20 @@ class MK2000B(command, temperature, pid, profile):
         else:
             raise ValueError('Invalid profile')
 
+    def read_profile(self, p: int):
+        if self.is_valid_profile(p):
+            p = int(p)
+            # The name may contain ';', so it is queried last and the
+            # response is only split at the first ';'.
+            count, name = self._controller._send_command(
+                f'PROF:EDIT:IC {p};:PROF:EDIT:GNAM {p}').split(';', 1)
+            items = self._controller._send_commands(
+                [f'PROF:EDIT:IRE {p},{i}' for i in range(int(count))])
+            return Profile(name.strip(), int(count),
+                           [self._parse_profile_item(item) for item in items])
+        else:
+            raise ValueError('Invalid profile')
+
     def set_profile_name(self, p: int, name: str):
         if self.is_valid_profile(p):
             if len(name) < 15:
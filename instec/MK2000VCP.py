@@ -1,8 +1,9 @@
-from ast import literal_eval
 from instec.temperature import temperature
 from instec.command import command
+from instec.records import DeviceInfo
+from instec.parsers import parse
 from instec.constants import (temperature_mode, system_status,
-                              unit, profile_status)
+                              unit)
 
 
 class MK2000VCP(command, temperature):
@@ -11,6 +12,9 @@ class MK2000VCP(command, temperature):
     ITEM_NUM = 255
 
     def get_system_information(self):
+        if self._info is not None:
+            return (self._info.company, self._info.model,
+                    self._info.serial, self._info.firmware)
         data = self._controller._send_command('*IDN?').strip().split(',')
         company = data[0]
         model = data[1]
@@ -22,38 +26,31 @@ class MK2000VCP(command, temperature):
 
         return company, model, serial, firmware
 
+    def _get_device_info(self):
+        # The queries are sent separately, as compound queries have not
+        # been verified on MK2000VCP firmware (see hold_check).
+        company, model, serial, firmware = self.get_system_information()
+        # Precision, units and ranges are not supported
+        return DeviceInfo(company, model, serial, firmware,
+                          self.get_slave_count(), None, None, None, None, None)
+
     def get_runtime_information(self):
-        rtin_raw = self._controller._send_command('TEMP:RTIN?')
-        rtin = (rtin_raw.split('MK')[1]).split(':')
-        sx = int(rtin[1])
-        pv = float(rtin[2])
-        mv = float(rtin[3])
-        tsp = float(rtin[4])
-        csp = float(rtin[5])
-        rt = float(rtin[6])
-        pp = float(rtin[7])
-        s_status = self._parse_vcp_system_status(int(rtin[8]))
-        profile = rtin[9].split(',')
-        p_status = profile_status(int(profile[0]))
-        p = int(profile[1])
-        i = int(profile[2])
-        # Not supported by VCP controllers
-        error_status = -1
-
-        return (sx, pv, mv, tsp, csp, rt, pp, s_status, p_status,
-                p, i, error_status)
-
-    def get_process_variables(self):
-        pv_raw = self._controller._send_command('TEMP:CTEM?')
-        pv = literal_eval(f'({pv_raw},)')
-        return pv
-
-    def get_monitor_values(self):
-        mv_raw = self._controller._send_command('TEMP:MTEM?')
-        mv = literal_eval(f'({mv_raw},)')
-        return mv
-
-    def get_protection_sensors(self):
+        return self._parse_runtime_information(
+            self._controller._send_command('TEMP:RTIN?'))
+
+    def _parse_runtime_information(self, rtin_raw: str):
+        return parse.runtime_information(
+            rtin_raw, parse.VCP_SYSTEM_STATUS, False)
+
+    def get_process_variables(self, out=None):
+        return parse.values(
+            self._controller._send_command('TEMP:CTEM?'), out)
+
+    def get_monitor_values(self, out=None):
+        return parse.values(
+            self._controller._send_command('TEMP:MTEM?'), out)
+
+    def get_protection_sensors(self, out=None):
         # Not supported
         raise NotImplementedError
 
@@ -101,6 +98,7 @@ class MK2000VCP(command, temperature):
     def set_cooling_heating_status(self, status: temperature_mode):
         if isinstance(status, temperature_mode):
             self._controller._send_command(f'TEMP:COOL {status.value}', False)
+            self._invalidate('cooling_heating_status')
         else:
             raise ValueError('Temperature mode is invalid')
 
@@ -120,6 +118,7 @@ class MK2000VCP(command, temperature):
         if min <= max:
             self._controller._send_command(
                     f'TEMP:RANG {float(max)},{float(min)}', False)
+            self._invalidate('operation_range')
         else:
             raise ValueError('max is smaller than min')
 
@@ -132,15 +131,14 @@ class MK2000VCP(command, temperature):
         return self._parse_vcp_system_status(status)
 
     def _parse_vcp_system_status(self, status: int) -> system_status:
-        match(status):
-            case 5:
-                return system_status.STOP
-            case 21:
-                return system_status.RPP
-            case _:
-                return system_status(status)
+        try:
+            return parse.VCP_SYSTEM_STATUS[status]
+        except KeyError:
+            return system_status(status)
 
     def get_serial_number(self):
+        if self._info is not None:
+            return self._info.serial
         return self._controller._send_command('TEMP:SNUM?').strip()
 
     def get_set_point_temperature(self):
@@ -167,10 +165,14 @@ class MK2000VCP(command, temperature):
     def set_operating_slave(self, slave: int):
         if slave >= 1 and slave <= self.get_slave_count():
             self._controller._send_command(f'TEMP:OPSL {int(slave)}', False)
+            if self._cache is not None:
+                self._cache['operating_slave'] = int(slave)
         else:
             raise ValueError('Invalid operating slave number')
 
     def get_slave_count(self):
+        if self._info is not None:
+            return self._info.slave_count
         return int(self._controller._send_command('TEMP:SLAV?'))
 
     def purge(self, delay: float, hold: float):
@@ -195,17 +197,20 @@ class MK2000VCP(command, temperature):
         # Not supported
         raise NotImplementedError
 
+    # The operating slave is queried separately, as compound queries have
+    # not been verified on MK2000VCP firmware (see hold_check).
     def get_process_variable(self):
-        return self.get_process_variables()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:CTEM?', False)
 
     def get_monitor_value(self):
-        return self.get_monitor_values()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:MTEM?', False)
 
     def get_protection_sensor(self):
-        return self.get_protection_sensors()[self.get_operating_slave() - 1]
+        return self._get_operating_slave_value('TEMP:PTEM?', False)
 
     def get_power_range(self):
-        status = self.get_cooling_heating_status()
+        status = self._cached('cooling_heating_status',
+                              self.get_cooling_heating_status)
         min = 0.0 if status == temperature_mode.HEATING_ONLY else -1.0
         max = 0.0 if status == temperature_mode.COOLING_ONLY else 1.0
         return max, min
@@ -219,7 +224,7 @@ class MK2000VCP(command, temperature):
         raise NotImplementedError
 
     def is_in_operation_range(self, temp: float):
-        max, min = self.get_operation_range()
+        max, min = self._cached('operation_range', self.get_operation_range)
         if temp >= min and temp <= max:
             return True
         else:
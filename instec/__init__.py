@@ -4,6 +4,15 @@
 from instec.MK2000 import MK2000
 from instec.MK2000B import MK2000B
 from instec.MK2000VCP import MK2000VCP
+from instec.AsyncMK2000B import AsyncMK2000B
+from instec.AsyncMK2000VCP import AsyncMK2000VCP
+from instec.poller import ControllerPoller, wait_all_settled
+from instec.sampler import Sampler, PollingPolicy, Deadband
+from instec.telemetry import TelemetryRecorder, TelemetryLog
+from instec.archive import ArchiveWriter, ArchiveReader
+from instec.estimator import EtaEstimator
+from instec.records import (DeviceInfo, RuntimeInfo, Event, SettleStats,
+                            EtaEstimate, ProfileItem, Profile)
 from instec.constants import (mode, system_status, temperature_mode,
                               unit, profile_status, profile_item,
                               pid_table, connection)
@@ -0,0 +1,368 @@
+"""Writer and reader classes for telemetry archives, compressed files of
+runtime information samples meant for long-term storage.
+"""
+
+import os
+import struct
+from array import array
+from instec.records import DeviceInfo
+from instec.telemetry import _log_format
+
+
+class _bit_writer:
+    """Appends values of any bit width to a byte string, most significant
+    bit first.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._value = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int):
+        self._value = (self._value << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        if self._bits >= 64:
+            whole = self._bits - self._bits % 8
+            self._bits -= whole
+            self._data += (self._value >> self._bits).to_bytes(
+                whole // 8, 'big')
+            self._value &= (1 << self._bits) - 1
+
+    def getvalue(self):
+        # Pad the last byte with zeros
+        return bytes(self._data) + (
+            (self._value << (-self._bits % 8)).to_bytes(
+                (self._bits + 7) // 8, 'big'))
+
+
+class _bit_reader:
+    """Reads values of any bit width from a byte string written by
+    _bit_writer.
+    """
+
+    def __init__(self, data: bytes):
+        # Padding so that a window of 9 bytes is always available
+        self._data = bytes(data) + bytes(9)
+        self._position = 0
+
+    def read(self, bits: int):
+        start = self._position >> 3
+        window = int.from_bytes(self._data[start:start + 9], 'big')
+        shift = 72 - (self._position & 7) - bits
+        self._position += bits
+        return (window >> shift) & ((1 << bits) - 1)
+
+    def read_signed(self, bits: int):
+        value = self.read(bits)
+        return value - (1 << bits) if value >> (bits - 1) else value
+
+
+class _archive_format:
+    """Layout of a telemetry archive. The file starts with the same header
+    as a telemetry log (see _log_format), followed by blocks of:
+
+        data size in bytes (uint32), record count (uint32), data
+
+    Each block is compressed independently. The first record of a block is
+    stored as is. For every following record, the time is stored as the
+    difference between consecutive deltas (in microseconds) and every other
+    value as the XOR with the previous value of the column, as described in
+    "Gorilla: A Fast, Scalable, In-Memory Time Series Database".
+    """
+    MAGIC = b'INSTECTA'
+    BLOCK = struct.Struct('<II')
+    # (prefix, prefix bits, value bits) of delta-of-delta time buckets
+    TIME_BUCKETS = ((0b10, 2, 7), (0b110, 3, 12), (0b1110, 4, 20))
+
+
+class ArchiveWriter:
+    """Compresses runtime information samples into a telemetry archive,
+    using delta-of-delta encoding for times and XOR encoding for values.
+    Values that change slowly or not at all take a few bits per sample
+    instead of 64. Values can also be rounded to the precision the
+    controller reports, so that sensor noise below that precision does not
+    need to be stored. Records are written in blocks of block_size, or when
+    flush() is called.
+    """
+
+    def __init__(self, path: str, columns: tuple = _log_format.COLUMNS,
+                 precision: dict = None, block_size: int = 4096):
+        """Open a telemetry archive for appending, creating it if it does
+        not exist.
+
+        Args:
+            path (str): Path of the telemetry archive.
+            columns (tuple, optional):  Name of each value of a record. The
+                                        first column must be the time.time()
+                                        of the record. Defaults to the
+                                        columns of a telemetry log.
+            precision (dict, optional): Number of decimal places each column
+                                        is rounded to, see
+                                        ArchiveWriter.device_precision().
+                                        Defaults to None (no rounding).
+            block_size (int, optional): Maximum number of records per block.
+                                        Defaults to 4096.
+
+        Raises:
+            ValueError: If the file exists but is not a compatible telemetry
+                        archive.
+            ValueError: If an invalid column is given in precision.
+        """
+        columns = tuple(columns)
+        precision = {} if precision is None else precision
+        for field in precision:
+            if field not in columns[1:]:
+                raise ValueError(f'Invalid field: {field}')
+        self._columns = columns
+        self._precision = [(index, precision[field])
+                           for index, field in enumerate(columns)
+                           if field in precision]
+        self._block_size = block_size
+
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                existing, _ = _log_format.read_header(
+                    file, _archive_format.MAGIC)
+            if existing != columns:
+                raise ValueError('Incompatible telemetry archive columns')
+            ArchiveReader._truncate(path)
+        else:
+            with open(path, 'xb') as file:
+                file.write(_log_format.header(columns, _archive_format.MAGIC))
+        self._file = open(path, 'ab')
+        self._start_block()
+
+    def device_precision(info: DeviceInfo):
+        """Get the precision of each column from the device information of
+        a controller.
+
+        Args:
+            info (DeviceInfo): Device information, see get_device_info().
+
+        Returns:
+            dict: Number of decimal places of the pv, mv, tsp and csp
+                  columns, or an empty dictionary if the controller does
+                  not report its precision.
+        """
+        if info.precision is None:
+            return {}
+        pv_precision, mv_precision = info.precision
+        return {'pv': pv_precision, 'mv': mv_precision,
+                'tsp': pv_precision, 'csp': pv_precision}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Write any buffered records and close the archive.
+        """
+        self.flush()
+        self._file.close()
+
+    def _start_block(self):
+        self._bits = _bit_writer()
+        self._count = 0
+        self._time = 0
+        self._delta = 0
+        self._values = None
+        self._windows = None
+
+    def flush(self):
+        """Write the records buffered so far as a block, so that readers
+        can decode them.
+        """
+        if self._count:
+            data = self._bits.getvalue()
+            self._file.write(_archive_format.BLOCK.pack(len(data),
+                                                        self._count) + data)
+            self._file.flush()
+        self._start_block()
+
+    def write(self, record):
+        """Append a record to the archive.
+
+        Args:
+            record (sequence): One float per column, starting with the
+                               time.time() of the record.
+
+        Raises:
+            ValueError: If the record does not have one value per column.
+        """
+        if len(record) != len(self._columns):
+            raise ValueError('Record must have one value per column')
+        record = array('d', record)
+        for index, places in self._precision:
+            record[index] = round(record[index], places)
+        timestamp = round(record[0] * 1e6)
+        values = array('Q', record.tobytes())[1:]
+        bits = self._bits
+
+        if self._count == 0:
+            bits.write(timestamp, 64)
+            for value in values:
+                bits.write(value, 64)
+            self._windows = [(64, 0)] * len(values)
+        else:
+            delta = timestamp - self._time
+            self._write_time(delta - self._delta)
+            self._delta = delta
+            for column, value in enumerate(values):
+                self._write_value(column, value ^ self._values[column])
+        self._time = timestamp
+        self._values = values
+
+        self._count += 1
+        if self._count == self._block_size:
+            self.flush()
+
+    def extend(self, records):
+        """Append many records to the archive, such as the rows of a
+        telemetry log:
+
+            writer.extend(zip(*(log.column(c) for c in log.columns)))
+
+        Args:
+            records (iterable): Records, see write().
+        """
+        for record in records:
+            self.write(record)
+
+    def _write_time(self, dod: int):
+        if dod == 0:
+            self._bits.write(0, 1)
+            return
+        for prefix, prefix_bits, value_bits in _archive_format.TIME_BUCKETS:
+            if -(1 << (value_bits - 1)) <= dod < (1 << (value_bits - 1)):
+                self._bits.write(prefix, prefix_bits)
+                self._bits.write(dod, value_bits)
+                return
+        self._bits.write(0b1111, 4)
+        self._bits.write(dod, 64)
+
+    def _write_value(self, column: int, xor: int):
+        bits = self._bits
+        if xor == 0:
+            bits.write(0, 1)
+            return
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        previous_leading, previous_trailing = self._windows[column]
+        if leading >= previous_leading and trailing >= previous_trailing:
+            # Meaningful bits fit in the window of the previous value
+            bits.write(0b10, 2)
+            bits.write(xor >> previous_trailing,
+                       64 - previous_leading - previous_trailing)
+        else:
+            length = 64 - leading - trailing
+            bits.write(0b11, 2)
+            bits.write(leading, 5)
+            bits.write(length, 6)
+            bits.write(xor >> trailing, length)
+            self._windows[column] = (leading, trailing)
+
+
+class ArchiveReader:
+    """Decodes the records of a telemetry archive. Records are decoded one
+    block at a time while iterating, so archives of any size can be read,
+    including archives that are still being written.
+    """
+
+    def __init__(self, path: str):
+        """Open a telemetry archive for reading.
+
+        Args:
+            path (str): Path of the telemetry archive.
+
+        Raises:
+            ValueError: If the file is not a telemetry archive.
+        """
+        self._path = path
+        with open(path, 'rb') as file:
+            self._columns, self._header_size = _log_format.read_header(
+                file, _archive_format.MAGIC)
+
+    @property
+    def columns(self) -> tuple:
+        """Names of the columns in the archive.
+        """
+        return self._columns
+
+    def __iter__(self):
+        """Iterate over the records of the archive.
+
+        Returns:
+            iterator: Tuple of floats for each record, starting with the
+                      time.time() of the record.
+        """
+        for data, count, _ in ArchiveReader._blocks(self._path,
+                                                    self._header_size):
+            yield from self._decode(data, count)
+
+    def _blocks(path: str, header_size: int = None):
+        # Generate the data, record count and end position of each
+        # complete block
+        with open(path, 'rb') as file:
+            if header_size is None:
+                _, header_size = _log_format.read_header(
+                    file, _archive_format.MAGIC)
+            file.seek(header_size)
+            while True:
+                position = file.tell()
+                block = file.read(_archive_format.BLOCK.size)
+                if len(block) < _archive_format.BLOCK.size:
+                    return
+                size, count = _archive_format.BLOCK.unpack(block)
+                data = file.read(size)
+                if len(data) < size:
+                    return
+                yield data, count, position + _archive_format.BLOCK.size + size
+
+    def _truncate(path: str):
+        # Remove a partially written block from the end of an archive
+        end = None
+        for _, _, end in ArchiveReader._blocks(path):
+            pass
+        if end is None:
+            with open(path, 'rb') as file:
+                _, end = _log_format.read_header(file, _archive_format.MAGIC)
+        os.truncate(path, end)
+
+    def _decode(self, data: bytes, count: int):
+        bits = _bit_reader(data)
+        columns = len(self._columns) - 1
+        values = array('Q', bytes(8 * columns))
+        windows = [(64, 0)] * columns
+        delta = 0
+        timestamp = bits.read_signed(64)
+        for column in range(columns):
+            values[column] = bits.read(64)
+        yield (timestamp / 1e6,) + tuple(array('d', values.tobytes()))
+
+        for _ in range(count - 1):
+            delta += self._read_time(bits)
+            timestamp += delta
+            for column in range(columns):
+                if bits.read(1) == 0:
+                    continue
+                if bits.read(1) == 0:
+                    leading, trailing = windows[column]
+                else:
+                    leading = bits.read(5)
+                    length = bits.read(6) or 64
+                    trailing = 64 - leading - length
+                    windows[column] = (leading, trailing)
+                values[column] ^= bits.read(
+                    64 - leading - trailing) << trailing
+            yield (timestamp / 1e6,) + tuple(array('d', values.tobytes()))
+
+    def _read_time(self, bits: _bit_reader):
+        if bits.read(1) == 0:
+            return 0
+        for *_, value_bits in _archive_format.TIME_BUCKETS:
+            if bits.read(1) == 0:
+                return bits.read_signed(value_bits)
+        return bits.read_signed(64)
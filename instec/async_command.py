@@ -0,0 +1,227 @@
+"""Command class that all asyncio command sets inherit.
+This class sets up the asyncio controller used for each command set, and
+turns every function of the synchronous command set into a coroutine.
+"""
+
+import asyncio
+import copy
+import time
+from instec.async_controller import async_controller
+from instec.constants import mode
+from instec.temperature import temperature
+from instec.pid import pid
+from instec.profile import profile
+from instec.sampler import Sampler, Deadband
+
+
+class _request(Exception):
+    """Raised by _transcript when a command has not been sent yet.
+    """
+
+    def __init__(self, function, *args):
+        super().__init__(*args)
+        self.function = function
+
+
+class _transcript:
+    """Stand-in for the controller that replays the responses of the
+    commands sent so far, in order, and requests the next command once
+    all responses have been used.
+    """
+
+    def __init__(self, responses):
+        self._responses = responses
+        self._index = 0
+        self._done = True
+
+    def _next(self, function, *args):
+        if self._index == len(self._responses):
+            self._done = False
+            raise _request(function, *args)
+        self._index += 1
+        return self._responses[self._index - 1]
+
+    def _send_command(self, command, returns=True):
+        return self._next('_send_command', command, returns)
+
+    def _send_commands(self, commands):
+        return self._next('_send_commands', commands)
+
+
+def _coroutine(name, function):
+    async def call(self, *args, **kwargs):
+        return await self._run(name, args, kwargs)
+    call.__name__ = name
+    call.__qualname__ = name
+    call.__doc__ = function.__doc__
+    return call
+
+
+class async_command:
+    """Base class of the asyncio command sets. Subclasses define
+    _command_set, and every temperature, PID and profile function of
+    that command set is made available as a coroutine.
+    """
+    _command_set = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for base in (temperature, pid, profile):
+            if issubclass(cls._command_set, base):
+                for name, function in vars(base).items():
+                    if callable(function) and not name.startswith('_'):
+                        setattr(cls, name, _coroutine(name, function))
+
+    def __init__(self, conn_mode: mode = None,
+                 baudrate: int = 38400, port: str = None,
+                 serial_num: str = None, ip: str = None,
+                 cache: bool = False):
+        """Initialize any relevant attributes necessary to connect to the
+        controller, and define the connection mode.
+
+        Args:
+            conn_mode (mode, optional):    USB or Ethernet connection mode.
+                                        Defaults to None.
+            baudrate (int, optional):   Baud rate (for USB only).
+                                        Defaults to 38400.
+            port (str, optional):       Serial port (for USB only).
+                                        Defaults to None.
+            cache (bool, optional):     Whether ranges and modes used to
+                                        validate parameters are cached
+                                        instead of queried on every call.
+                                        Defaults to False.
+        """
+        self._controller = async_controller(conn_mode, baudrate,
+                                            port, serial_num, ip)
+        self._command = self._command_set.__new__(self._command_set)
+        self._command._controller = None
+        self._command._cache = {} if cache else None
+        self._command._info = None
+
+    async def _run(self, name, args, kwargs):
+        """Run a function of the synchronous command set, sending each
+        command it needs to the controller without blocking. The function
+        is replayed with the responses received so far until it no longer
+        needs another command.
+        """
+        responses = []
+        cache = self._command._cache
+        if cache is not None:
+            cache = dict(cache)
+        while True:
+            command = copy.copy(self._command)
+            command._controller = _transcript(responses)
+            # Every replay must send the same commands, so each one starts
+            # from the cache as it was before the first replay.
+            if cache is not None:
+                command._cache = dict(cache)
+            try:
+                return getattr(command, name)(*args, **kwargs)
+            except _request as request:
+                responses.append(await getattr(
+                    self._controller, request.function)(*request.args))
+            finally:
+                if cache is not None and command._controller._done:
+                    async_command._merge(self._command._cache, cache,
+                                         command._cache)
+
+    def _merge(target: dict, before: dict, after: dict):
+        """Apply the changes a finished run made to its copy of the cache.
+        """
+        for key in before.keys() - after.keys():
+            target.pop(key, None)
+        for key, value in after.items():
+            if key not in before or before[key] is not value:
+                target[key] = value
+
+    def stream(self, fields: tuple = ('pv', 'tsp', 'pp'), hz: float = 5,
+               deadband: Deadband = None):
+        """Get an asynchronous generator that yields the runtime
+        information of the controller at a fixed rate. Each sample is a
+        single TEMP:RTIN? exchange. Samples are timed against fixed
+        deadlines, so the rate does not drift; if the consumer falls
+        behind, missed samples are skipped instead of being sent late.
+
+            async for sample in controller.stream(('pv', 'tsp'), hz=10):
+                print(sample.time, sample.pv, sample.tsp)
+
+        Args:
+            fields (tuple, optional):   RuntimeInfo fields included in each
+                                        sample. Defaults to
+                                        ('pv', 'tsp', 'pp').
+            hz (float, optional):       Samples per second. Defaults to 5.
+            deadband (Deadband, optional):  Deadband that suppresses samples
+                                            which did not change enough.
+                                            Defaults to None.
+
+        Raises:
+            ValueError: If an invalid field is given.
+            ValueError: If hz is not positive.
+
+        Returns:
+            async_generator: Asynchronous generator of named tuples with the
+                             time.time() of the sample followed by the given
+                             fields.
+        """
+        sample, indices = Sampler._sample_type(fields)
+        return self._stream(sample, indices, Sampler._to_period(hz),
+                            deadband)
+
+    async def _stream(self, sample, indices, period, deadband):
+        deadline = time.monotonic()
+        while True:
+            info = await self.get_runtime_information()
+            timestamp = time.time()
+            if deadband is None or deadband.check(info, timestamp):
+                yield sample(timestamp, *(info[index] for index in indices))
+            deadline = Sampler._next_deadline(deadline, period)
+            await asyncio.sleep(max(deadline - time.monotonic(), 0))
+
+    def refresh(self):
+        """Clear all cached values, so they are queried from the controller
+        the next time they are needed. Call this after changing settings
+        such as the operation range or cooling/heating mode on the front
+        panel of the controller.
+        """
+        self._command.refresh()
+
+    async def connect(self, prefetch: bool = False):
+        """Connect to controller via selected connection mode.
+
+        Args:
+            prefetch (bool, optional):  Whether static information about the
+                                        controller is retrieved right away
+                                        (see get_device_info).
+                                        Defaults to False.
+        """
+        self._command._info = None
+        await self._controller.connect()
+        if prefetch:
+            await self.get_device_info()
+
+    async def get_device_info(self):
+        """Get static information about the controller, such as its serial
+        number, slave count, precision, units and stage range. All values
+        are retrieved in one compound exchange the first time, after which
+        they are kept until the controller is disconnected.
+
+        Returns:
+            DeviceInfo: Static information about the controller.
+        """
+        if self._command._info is None:
+            self._command._info = await self._run('_get_device_info', (), {})
+        return self._command._info
+
+    async def is_connected(self):
+        """Check connection to controller.
+
+        Returns:
+            bool: True if connected, False otherwise.
+        """
+        return await self._controller.is_connected()
+
+    async def disconnect(self):
+        """Disconnect from the controller.
+        """
+        self._command._info = None
+        await self._controller.disconnect()
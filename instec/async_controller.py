@@ -0,0 +1,255 @@
+"""Class that contains all of the functions setting up an asyncio
+connection with the MK2000/MK2000B controller itself.
+"""
+
+import asyncio
+import serial
+from instec.controller import controller
+from instec.constants import mode, connection
+
+
+class async_controller(controller):
+    """All basic communication functions to interface with the MK2000/MK2000B
+    from an asyncio event loop. Ethernet connections use
+    asyncio.open_connection, USB connections are read without blocking by
+    watching the serial port from the event loop.
+    """
+
+    def __init__(self, conn_mode: mode = None,
+                 baudrate: int = 38400, port: str = None,
+                 serial_num: str = None, ip: str = None):
+        """Initialize any relevant attributes necessary to connect to the
+        controller, and define the connection mode. Finding the controller
+        by serial number blocks until discovery is complete.
+
+        Args:
+            conn_mode (mode, optional):    USB or Ethernet connection mode.
+                                        Defaults to None.
+            baudrate (int, optional):   Baud rate (USB mode only).
+                                        Defaults to 38400.
+            port (str, optional):       Serial port (USB mode only).
+                                        Defaults to None.
+            serial_num (str, optional): Serial number of controller.
+                                        Defaults to None.
+            ip (str, optional):         IP address of controller
+                                        (Ethernet mode only).
+                                        Defaults to None.
+
+        Raises:
+            ValueError: If invalid connection mode is given.
+        """
+        super().__init__(conn_mode, baudrate, port, serial_num, ip)
+        self._reader = None
+        self._writer = None
+        self._pump = None
+        self._lock = asyncio.Lock()
+        self._unread = 0
+
+    async def connect(self):
+        """Connect to controller via selected connection mode. If the
+        controller was found in the discovery cache, its serial number is
+        checked first and the controller is discovered again if the cached
+        address is stale.
+
+        Raises:
+            RuntimeError:   If unable to connect via COM port.
+            RuntimeError:   If TCP connection cannot be established.
+            ValueError:     If invalid connection mode is given.
+        """
+        if self._cached_serial is None:
+            await self._open()
+            return
+
+        serial_num, self._cached_serial = self._cached_serial, None
+        try:
+            await self._open()
+            if await self._is_controller(serial_num):
+                return
+            await self.disconnect()
+        except RuntimeError:
+            pass
+        self._rediscover(serial_num)
+        await self._open()
+
+    async def _is_controller(self, serial_num: str):
+        # A silent device at the cached address must not block connect(),
+        # so the whole check is limited to connection.TIMEOUT.
+        try:
+            return await asyncio.wait_for(self._has_serial(serial_num),
+                                          connection.TIMEOUT)
+        except Exception:
+            return False
+
+    async def _has_serial(self, serial_num: str):
+        data = (await self._send_command('*IDN?')).strip().split(',')
+        if len(data) > 2 and data[2] == serial_num:
+            return True
+        response = await self._send_command('TEMP:SNUM?')
+        return response.strip() == serial_num
+
+    async def _open(self):
+        self._unread = 0
+        if self._mode == mode.USB:
+            try:
+                self._usb.timeout = 0
+                self._usb.open()
+            except serial.SerialException as error:
+                raise RuntimeError('Unable to connect via COM port') from error
+            loop = asyncio.get_running_loop()
+            self._reader = asyncio.StreamReader()
+            try:
+                loop.add_reader(self._usb.fileno(), self._read_usb)
+            except (AttributeError, NotImplementedError):
+                # No file descriptor to watch (e.g. Windows), so poll the
+                # port from a worker thread instead.
+                self._usb.timeout = 0.1
+                self._pump = loop.create_task(self._pump_usb())
+        elif self._mode == mode.ETHERNET:
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._controller_address, 50292),
+                    connection.TIMEOUT)
+            except OSError as error:
+                raise RuntimeError('Issues connecting to device') from error
+            except Exception as error:
+                raise RuntimeError('Unable to establish '
+                                   'TCP connection') from error
+        else:
+            raise ValueError('Invalid connection mode')
+
+    def _read_usb(self):
+        try:
+            data = self._usb.read(self._usb.in_waiting or 1)
+        except serial.SerialException as error:
+            asyncio.get_running_loop().remove_reader(self._usb.fileno())
+            self._reader.set_exception(error)
+        else:
+            self._reader.feed_data(data)
+
+    async def _pump_usb(self):
+        loop = asyncio.get_running_loop()
+        while self._usb.is_open:
+            try:
+                data = await loop.run_in_executor(
+                    None, lambda: self._usb.read(self._usb.in_waiting or 1))
+            except serial.SerialException as error:
+                self._reader.set_exception(error)
+                break
+            self._reader.feed_data(data)
+
+    async def disconnect(self):
+        """Disconnect from the controller.
+
+        Raises:
+            ValueError: If invalid connection mode is given.
+        """
+        if self._mode == mode.USB:
+            if self._pump is not None:
+                self._pump.cancel()
+                self._pump = None
+            elif self._usb.is_open:
+                asyncio.get_running_loop().remove_reader(self._usb.fileno())
+            self._usb.close()
+        elif self._mode == mode.ETHERNET:
+            if self._writer is not None:
+                self._writer.close()
+                try:
+                    await self._writer.wait_closed()
+                except OSError:
+                    pass
+        else:
+            raise ValueError('Invalid connection mode')
+
+    async def is_connected(self):
+        """Check connection to controller.
+
+        Raises:
+            ValueError: If invalid connection mode is given.
+
+        Returns:
+            bool: True if connected, False otherwise.
+        """
+        if self._mode == mode.USB:
+            return self._usb.is_open
+        elif self._mode == mode.ETHERNET:
+            return (self._writer is not None
+                    and not self._writer.is_closing()
+                    and not self._reader.at_eof())
+        else:
+            raise ValueError('Invalid connection mode')
+
+    async def _send_command(self, command, returns=True):
+        """Internal function to process and send SCPI commands via the
+        desired communication method. Exchanges on the same connection
+        are serialized, so concurrent tasks always receive their own
+        response. Responses that arrive after their command timed out are
+        dropped, so that they are not read as the response to a later
+        command.
+
+        Args:
+            command (str):              The command to run in SCPI format.
+            returns (bool, optional):   Whether the command should return.
+                                        Defaults to True.
+
+        Raises:
+            RuntimeError: If no response is received.
+            ValueError: If invalid connection mode is given.
+
+        Returns:
+            str: None if returns is False, otherwise the value received.
+        """
+        async with self._lock:
+            if self._mode == mode.USB:
+                self._usb.write(str.encode(f'{command}\n'))
+            elif self._mode == mode.ETHERNET:
+                self._writer.write(str.encode(f'{command}\n'))
+                await self._writer.drain()
+            else:
+                raise ValueError('Invalid connection mode')
+            if returns:
+                self._unread += 1
+                try:
+                    return await asyncio.wait_for(self._receive(),
+                                                  connection.TIMEOUT)
+                except Exception as error:
+                    raise RuntimeError('Unable to receive response') from error
+            else:
+                return None
+
+    async def _receive(self):
+        # _unread counts the responses still owed on the connection,
+        # including those of commands that timed out. Every frame
+        # before the last one is such a late response and is dropped.
+        while True:
+            buffer = await self._reader.readuntil(b'\r\n')
+            self._unread -= 1
+            if not self._unread:
+                return buffer.decode()
+
+    async def _send_commands(self, commands):
+        """Internal function to send several SCPI queries as compound
+        commands, so that they are answered in as few exchanges as
+        possible. At most connection.COMPOUND_LIMIT queries are joined
+        into each compound command.
+
+        Args:
+            commands (list): The queries to run in SCPI format.
+
+        Raises:
+            RuntimeError: If the number of responses does not match the
+                          number of queries.
+
+        Returns:
+            list: The response of each query, in the same order.
+        """
+        responses = []
+        for start in range(0, len(commands), connection.COMPOUND_LIMIT):
+            chunk = commands[start:start + connection.COMPOUND_LIMIT]
+            if len(chunk) == 1:
+                responses.append(await self._send_command(chunk[0]))
+            else:
+                responses.extend(controller._split_response(
+                    await self._send_command(
+                        controller._join_commands(chunk)),
+                    len(chunk)))
+        return responses
@@ -0,0 +1,133 @@
+"""Batch class that collects several queries and sends them to the
+controller as compound SCPI commands.
+"""
+
+import copy
+from concurrent.futures import Future
+
+
+class _pending(Exception):
+    """Raised by _recorder when a query has not been answered yet.
+    """
+
+    def __init__(self, commands):
+        super().__init__(*commands)
+        self.commands = commands
+
+
+class _recorder:
+    """Stand-in for the controller that answers queries from the responses
+    received so far and reports every query that is still unanswered.
+    """
+
+    def __init__(self, responses):
+        self._responses = responses
+
+    def _send_command(self, command, returns=True):
+        if not returns or not _recorder._is_query(command):
+            raise ValueError('Only queries can be batched')
+        if command not in self._responses:
+            raise _pending([command])
+        return self._responses[command]
+
+    def _send_commands(self, commands):
+        if not all(_recorder._is_query(c) for c in commands):
+            raise ValueError('Only queries can be batched')
+        missing = [c for c in commands if c not in self._responses]
+        if missing:
+            raise _pending(missing)
+        return [self._responses[c] for c in commands]
+
+    def _is_query(command):
+        # Commands that return a response, such as 'TEMP:HOLD x; ERR?',
+        # would be executed by the batch and break the response count of
+        # the compound command, so only single queries are accepted.
+        command = command.strip()
+        return command.endswith('?') and ';' not in command
+
+
+class batch:
+    """Collects calls to query functions of a command set and sends all of
+    their SCPI queries in as few compound commands as possible.
+
+    Every call made on the batch returns a Future, which holds the parsed
+    value once the batch has been sent:
+
+        with controller.batch() as b:
+            pv = b.get_process_variables()
+            status = b.get_system_status()
+        print(pv.result(), status.result())
+
+    Functions that send more than one query (such as get_process_variable)
+    are supported, each additional query costs one more exchange for the
+    whole batch rather than one per call. Functions that send commands,
+    including commands that return a response such as hold_check(), cannot
+    be batched, and their Future will raise a ValueError.
+    """
+
+    def __init__(self, command):
+        """Initialize an empty batch.
+
+        Args:
+            command (command): The command set the queries are run on.
+        """
+        self._command = command
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+        else:
+            self._calls = []
+
+    def __getattr__(self, name):
+        function = getattr(self._command, name)
+        if name.startswith('_') or not callable(function):
+            raise AttributeError(f'{name} cannot be batched')
+
+        def call(*args, **kwargs):
+            future = Future()
+            self._calls.append((future, name, args, kwargs))
+            return future
+        return call
+
+    def send(self):
+        """Send all collected queries to the controller and resolve the
+        Future of every call. Called automatically when the with block
+        exits.
+
+        Raises:
+            RuntimeError: If the controller does not respond.
+        """
+        responses = {}
+        proxy = copy.copy(self._command)
+        proxy._controller = _recorder(responses)
+        calls, self._calls = self._calls, []
+
+        # Each call is parsed again once its queries have been answered,
+        # any follow-up query it needs is sent in the next exchange.
+        while calls:
+            missing = []
+            waiting = []
+            for call in calls:
+                future, name, args, kwargs = call
+                try:
+                    future.set_result(getattr(proxy, name)(*args, **kwargs))
+                except _pending as pending:
+                    missing.extend(c for c in pending.commands
+                                   if c not in missing)
+                    waiting.append(call)
+                except Exception as error:
+                    future.set_exception(error)
+            if missing:
+                try:
+                    data = self._command._controller._send_commands(missing)
+                except Exception as error:
+                    for future, *_ in waiting:
+                        future.set_exception(error)
+                    raise
+                responses.update(zip(missing, data))
+            calls = waiting
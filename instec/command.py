@@ -2,19 +2,34 @@
 This class sets up the controller used for each command set.
 """
 
+import time
 from instec.controller import controller, mode
+from instec.batch import batch
+from instec.parsers import parse
+from instec.sampler import Sampler, PollingPolicy, Deadband, _events
+from instec.estimator import EtaEstimator, _settle_tracker
 
 
 class command:
-    def get_ethernet_controllers():
-        return controller.get_ethernet_controllers()
+    def get_ethernet_controllers(timeout: float = None):
+        return controller.get_ethernet_controllers(timeout)
 
-    def get_usb_controllers():
-        return controller.get_usb_controllers()
+    def iter_ethernet_controllers(serial_num: str = None, count: int = None,
+                                  timeout: float = None):
+        return controller.iter_ethernet_controllers(serial_num, count,
+                                                    timeout)
+
+    def get_usb_controllers(timeout: float = None):
+        return controller.get_usb_controllers(timeout)
+
+    def iter_usb_controllers(serial_num: str = None, count: int = None,
+                             timeout: float = None):
+        return controller.iter_usb_controllers(serial_num, count, timeout)
 
     def __init__(self, conn_mode: mode = None,
                  baudrate: int = 38400, port: str = None,
-                 serial_num: str = None, ip: str = None):
+                 serial_num: str = None, ip: str = None,
+                 cache: bool = False):
         """Initialize any relevant attributes necessary to connect to the
         controller, and define the connection mode.
 
@@ -25,14 +40,31 @@ class command:
                                         Defaults to 38400.
             port (str, optional):       Serial port (for USB only).
                                         Defaults to None.
+            cache (bool, optional):     Whether ranges and modes used to
+                                        validate parameters are cached
+                                        instead of queried on every call.
+                                        Defaults to False.
         """
         self._controller = controller(conn_mode, baudrate,
                                       port, serial_num, ip)
+        self._cache = {} if cache else None
+        self._info = None
+        self._sampler = None
+        self._events = _events()
 
-    def connect(self):
+    def connect(self, prefetch: bool = False):
         """Connect to controller via selected connection mode.
+
+        Args:
+            prefetch (bool, optional):  Whether static information about the
+                                        controller is retrieved right away
+                                        (see get_device_info).
+                                        Defaults to False.
         """
+        self._info = None
         self._controller.connect()
+        if prefetch:
+            self.get_device_info()
 
     def is_connected(self):
         """Check connection to controller.
@@ -43,6 +75,286 @@ class command:
         return self._controller.is_connected()
 
     def disconnect(self):
-        """Disconnect from the controller.
+        """Disconnect from the controller. Sampling is stopped first.
         """
+        self.stop_sampling()
+        self._info = None
         self._controller.disconnect()
+
+    def get_device_info(self):
+        """Get static information about the controller, such as its serial
+        number, slave count, precision, units and stage range. All values
+        are retrieved in one compound exchange the first time, after which
+        they are kept until the controller is disconnected. While they are
+        kept, functions such as get_serial_number() and get_slave_count()
+        answer without querying the controller.
+
+        Returns:
+            DeviceInfo: Static information about the controller.
+        """
+        if self._info is None:
+            self._info = self._get_device_info()
+        return self._info
+
+    def batch(self):
+        """Create a batch that collects queries and sends them to the
+        controller as compound commands when the with block exits:
+
+            with controller.batch() as b:
+                pv = b.get_process_variables()
+                status = b.get_system_status()
+            print(pv.result(), status.result())
+
+        Returns:
+            batch: Batch whose calls return a Future of the parsed value.
+        """
+        return batch(self)
+
+    def start_sampling(self, hz: float = 10, capacity: int = 36000,
+                       policy: PollingPolicy = None,
+                       estimator: EtaEstimator = None):
+        """Start polling the runtime information of the controller from a
+        background thread. Samples are kept in a ring buffer that holds the
+        most recent capacity samples, and can be read from any thread while
+        sampling continues. A running sampler is stopped first.
+
+        Args:
+            hz (float, optional):   Samples per second. Defaults to 10.
+            capacity (int, optional):   Number of samples kept in the buffer.
+                                        Defaults to 36000 (one hour at
+                                        10 Hz).
+            policy (PollingPolicy, optional):   Policy that adapts the rate to
+                                                the system and profile status
+                                                after each sample, in which
+                                                case hz is only used for the
+                                                first sample.
+                                                Defaults to None.
+            estimator (EtaEstimator, optional): Estimator used by eta().
+                                                Defaults to an EtaEstimator
+                                                with default settings.
+
+        Raises:
+            ValueError: If hz or capacity is not positive.
+
+        Returns:
+            Sampler: The running sampler.
+        """
+        self.stop_sampling()
+        self._sampler = Sampler(self, hz, capacity, policy, self._events,
+                                estimator)
+        self._sampler.start()
+        return self._sampler
+
+    def stop_sampling(self):
+        """Stop the sampler started by start_sampling(), if any.
+        """
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    def eta(self, confidence: float = 0.95):
+        """Get the expected time until PV reaches TSP during a RAMP or HOLD.
+        The slope of PV is fitted to the samples of the sampler (see
+        start_sampling()), so the estimate follows the actual heating or
+        cooling rate instead of the nominal ramp rate.
+
+        Args:
+            confidence (float, optional):   Confidence level of the interval.
+                                            Defaults to 0.95.
+
+        Raises:
+            RuntimeError: If sampling has not been started.
+            ValueError: If confidence is not between 0 and 1.
+
+        Returns:
+            EtaEstimate: Expected seconds until TSP is reached, counted from
+                         the last sample, with the bounds of the confidence
+                         interval, or None if the controller is not in RAMP
+                         or HOLD, too few samples have been taken, or PV is
+                         not moving towards TSP.
+        """
+        if self._sampler is None:
+            raise RuntimeError('Sampling has not been started')
+        return self._sampler.eta(confidence)
+
+    def on(self, event: str, callback, band: float = 1.0):
+        """Call a function whenever an event is detected between two
+        samples of the sampler (see start_sampling()). Events are only
+        detected while sampling, and callbacks are called from the sampler
+        thread with an Event holding the name, time, old and new value, and
+        the sample that caused it:
+
+            system_status:  System status changed (old/new system_status)
+            profile_status: Profile status changed (old/new profile_status)
+            profile_item:   Profile item index changed (old/new index)
+            error:          Error status changed to a non-zero code
+                            (old/new error code)
+            enter_band:     PV came within band of TSP (old False, new True)
+            leave_band:     PV moved outside band of TSP (old True, new False)
+
+        Callbacks are kept when sampling is restarted. Exceptions raised by
+        callbacks are stored in the error attribute of the sampler.
+
+        Args:
+            event (str): Name of the event.
+            callback (function):    Function called with an Event.
+            band (float, optional): Largest difference between PV and TSP
+                                    that is within the band (enter_band and
+                                    leave_band only). Defaults to 1.0.
+
+        Raises:
+            ValueError: If an invalid event is given.
+            ValueError: If band is negative.
+        """
+        self._events.on(event, callback, band)
+
+    def off(self, event: str, callback):
+        """Stop calling a function registered with on().
+
+        Args:
+            event (str): Name of the event.
+            callback (function): Function registered with on().
+
+        Raises:
+            ValueError: If an invalid event is given.
+        """
+        self._events.off(event, callback)
+
+    def wait_until_settled(self, tsp: float = None, tolerance: float = 0.1,
+                           stable_for: float = 10, timeout: float = None,
+                           interval: float = 0.25):
+        """Wait until PV is within tolerance of TSP and has stayed there for
+        stable_for seconds. Far from the target, the wait is predicted from
+        the distance to TSP and the ramp rate (or the rate PV approaches
+        TSP at over the last few checks, if no ramp rate is set), and half
+        of the predicted time, at most a few seconds, is slept before
+        checking again. Near the target, or if PV is not clearly moving
+        towards it, PV is checked every interval seconds. Every check is a
+        single TEMP:RTIN? exchange.
+
+        Args:
+            tsp (float, optional):      Target temperature. Defaults to the
+                                        current TSP of the controller.
+            tolerance (float, optional):    Largest difference between PV
+                                            and TSP that counts as settled.
+                                            Defaults to 0.1.
+            stable_for (float, optional):   Time in seconds PV must stay
+                                            within tolerance. Defaults to 10.
+            timeout (float, optional):  Longest time to wait in seconds.
+                                        Defaults to None (no limit).
+            interval (float, optional): Time between checks near the target
+                                        in seconds. Defaults to 0.25.
+
+        Raises:
+            ValueError: If tolerance, stable_for or interval is invalid.
+            TimeoutError: If PV did not settle within timeout.
+
+        Returns:
+            SettleStats: Time until PV first came within tolerance, total
+                         time, overshoot past TSP, largest deviation while
+                         stable, final PV and number of checks.
+        """
+        if tolerance < 0 or stable_for < 0:
+            raise ValueError('Tolerance and stable time must not be negative')
+        if interval <= 0:
+            raise ValueError('Interval must be positive')
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        tracker = _settle_tracker(tsp, tolerance, stable_for, start)
+        while True:
+            info = self.get_runtime_information()
+            now = time.monotonic()
+            stats = tracker.update(info, now, interval)
+            if stats is not None:
+                return stats
+            delay = tracker.delay
+            if deadline is not None:
+                if now >= deadline:
+                    raise TimeoutError('PV did not settle within timeout')
+                delay = min(delay, deadline - now)
+            time.sleep(delay)
+
+    def stream(self, fields: tuple = ('pv', 'tsp', 'pp'), hz: float = 5,
+               deadband: Deadband = None):
+        """Get a generator that yields the runtime information of the
+        controller at a fixed rate. Each sample is a single TEMP:RTIN?
+        exchange. Samples are timed against fixed deadlines, so the rate
+        does not drift; if the consumer falls behind, missed samples are
+        skipped instead of being sent late.
+
+            for sample in controller.stream(('pv', 'tsp'), hz=10):
+                print(sample.time, sample.pv, sample.tsp)
+
+        Args:
+            fields (tuple, optional):   RuntimeInfo fields included in each
+                                        sample. Defaults to
+                                        ('pv', 'tsp', 'pp').
+            hz (float, optional):       Samples per second. Defaults to 5.
+            deadband (Deadband, optional):  Deadband that suppresses samples
+                                            which did not change enough.
+                                            Defaults to None.
+
+        Raises:
+            ValueError: If an invalid field is given.
+            ValueError: If hz is not positive.
+
+        Returns:
+            generator: Generator of named tuples with the time.time() of the
+                       sample followed by the given fields.
+        """
+        sample, indices = Sampler._sample_type(fields)
+        return self._stream(sample, indices, Sampler._to_period(hz),
+                            deadband)
+
+    def _stream(self, sample, indices, period, deadband):
+        deadline = time.monotonic()
+        while True:
+            info = self.get_runtime_information()
+            timestamp = time.time()
+            if deadband is None or deadband.check(info, timestamp):
+                yield sample(timestamp, *(info[index] for index in indices))
+            deadline = Sampler._next_deadline(deadline, period)
+            time.sleep(max(deadline - time.monotonic(), 0))
+
+    def refresh(self):
+        """Clear all cached values, so they are queried from the controller
+        the next time they are needed. Call this after changing settings
+        such as the operation range or cooling/heating mode on the front
+        panel of the controller.
+        """
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _cached(self, key: str, query):
+        """Return the cached value of key, calling query to get the value
+        from the controller if it is not cached or caching is disabled.
+        """
+        if self._cache is None:
+            return query()
+        if key not in self._cache:
+            self._cache[key] = query()
+        return self._cache[key]
+
+    def _invalidate(self, *keys: str):
+        """Remove keys from the cache after the controller changed them.
+        """
+        if self._cache is not None:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def _get_operating_slave_value(self, query: str, compound: bool = True):
+        """Return the value of the operating slave from a query that returns
+        the values of every slave. The operating slave is either cached or,
+        if compound is True, queried in the same compound command, so only
+        one exchange is needed.
+        """
+        if self._cache is not None:
+            slave = self._cached('operating_slave', self.get_operating_slave)
+            values = self._controller._send_command(query)
+        elif compound:
+            values, slave = self._controller._send_commands(
+                [query, 'TEMP:OPSL?'])
+        else:
+            slave = self.get_operating_slave()
+            values = self._controller._send_command(query)
+        return parse.values(values)[int(slave) - 1]
@@ -8,6 +8,11 @@ class connection:
     TIMEOUT = 1
     ETHERNET_PORT = 'eth0'
     IP_ADDRESS = None
+    COMPOUND_LIMIT = 8  # Max number of queries sent in one compound command
+    USB_IDS = []        # (vid, pid) tuples of USB ports probed for devices
+    USB_MANUFACTURERS = []  # Manufacturer names of USB ports probed
+    CACHE_PATH = None   # Discovery cache file, None to disable the cache
+    CACHE_TTL = 86400   # Time in seconds until a cache entry expires
 
 
 class mode(Enum):
@@ -3,6 +3,9 @@ with the MK2000/MK2000B controller itself.
 """
 
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import serial
 from serial.tools import list_ports
 import socket
@@ -11,6 +14,77 @@ if sys.platform.startswith('linux'):
     import fcntl
     import struct
 from instec.constants import mode, connection
+from instec.discovery_cache import discovery_cache
+
+
+class _receive_buffer:
+    """Per-connection receive buffer that splits the incoming byte stream
+    into frames terminated by \r\n. Bytes after the end of a frame are
+    kept for the next frame. Responses to queries that were abandoned
+    (see discard_next()) are dropped as they arrive, so that they are not
+    read as the response to a later query.
+    """
+
+    def __init__(self, size: int = 1024):
+        self._data = bytearray()
+        self._chunk = bytearray(size)
+        self._view = memoryview(self._chunk)
+        self._scanned = 0
+        self._stale = 0
+
+    def recv_from(self, sock: socket.socket):
+        """Receive available bytes from a socket into the buffer.
+
+        Raises:
+            ConnectionError: If the socket has been closed.
+        """
+        count = sock.recv_into(self._chunk)
+        if count == 0:
+            raise ConnectionError('Connection closed by controller')
+        self._data += self._view[:count]
+
+    def feed(self, data: bytes):
+        """Append received bytes to the buffer.
+        """
+        self._data += data
+
+    def next_frame(self):
+        """Remove and decode the next complete frame from the buffer.
+
+        Returns:
+            str: The frame including \r\n, or None if it is incomplete.
+        """
+        while True:
+            # Only the bytes received since the last call need to be
+            # scanned, starting one byte earlier in case \r\n was split
+            # between reads.
+            end = self._data.find(b'\r\n', max(self._scanned - 1, 0))
+            if end < 0:
+                self._scanned = len(self._data)
+                return None
+            end += 2
+            self._scanned = 0
+            if self._stale:
+                self._stale -= 1
+                del self._data[:end]
+                continue
+            with memoryview(self._data) as view:
+                frame = str(view[:end], 'utf-8')
+            del self._data[:end]
+            return frame
+
+    def discard_next(self):
+        """Drop the next frame when it arrives, such as the late response
+        to a query that timed out.
+        """
+        self._stale += 1
+
+    def clear(self):
+        """Discard all buffered bytes and abandoned responses.
+        """
+        self._data.clear()
+        self._scanned = 0
+        self._stale = 0
 
 
 class controller:
@@ -39,79 +113,197 @@ class controller:
         else:
             raise RuntimeError('Unsupported OS')
 
-    def get_ethernet_controllers():
+    def get_ethernet_controllers(timeout: float = None):
         """Get all controllers connected via Ethernet.
 
+        Args:
+            timeout (float, optional):  Time to wait for responses in
+                                        seconds. Defaults to
+                                        connection.TIMEOUT.
+
         Returns:
             List: List of tuples in the form (serial_num, ip)
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.settimeout(connection.TIMEOUT)
-        sock.bind(("", 50291))
-        sock.sendto(bytes.fromhex('73C4000001'), ('255.255.255.255', 50290))
-
         controller.ethernet = []
+        return list(controller.iter_ethernet_controllers(timeout=timeout))
+
+    def iter_ethernet_controllers(serial_num: str = None, count: int = None,
+                                  timeout: float = None):
+        """Yield controllers connected via Ethernet as soon as their
+        response to the discovery broadcast arrives. Discovery stops early
+        once the controller with serial_num or count controllers have
+        been found.
+
+        Args:
+            serial_num (str, optional): Only yield the controller with this
+                                        serial number. Defaults to None.
+            count (int, optional):      Number of controllers to find.
+                                        Defaults to None.
+            timeout (float, optional):  Time to wait for responses in
+                                        seconds. Defaults to
+                                        connection.TIMEOUT.
+
+        Yields:
+            tuple: Tuple in the form (serial_num, ip)
+        """
+        timeout = connection.TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        found = 0
+        seen = set()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("", 50291))
+            sock.sendto(bytes.fromhex('73C4000001'),
+                        ('255.255.255.255', 50290))
 
-        start_time = time.time()
-        try:
             while True:
-                buffer, addr = sock.recvfrom(1024)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                sock.settimeout(remaining)
+                try:
+                    buffer, addr = sock.recvfrom(1024)
+                except socket.timeout:
+                    return
                 buffer = buffer.decode(errors='ignore')
                 data = buffer.strip().split(':')
 
                 if len(data) < 2:
                     continue
 
-                model, serial_num = data[0], data[1]
-
-                if model.startswith(('IoT_MK#MK2000', 'IoT_MK#MAGNET')):
-                    controller.ethernet.append((serial_num, addr[0]))
+                model, serial = data[0], data[1]
 
-                if time.time() - start_time > connection.TIMEOUT:
-                    break
+                if not model.startswith(('IoT_MK#MK2000', 'IoT_MK#MAGNET')):
+                    continue
+                if (serial, addr[0]) in seen:
+                    continue
+                seen.add((serial, addr[0]))
+                if (serial, addr[0]) not in controller.ethernet:
+                    controller.ethernet.append((serial, addr[0]))
+                if serial_num is not None and serial != serial_num:
+                    continue
 
-        except socket.timeout:
+                yield serial, addr[0]
+                found += 1
+                if serial_num is not None or found == count:
+                    return
+
+    def _is_usb_candidate(port):
+        # Every port is probed unless a filter is set, in which case ports
+        # without USB metadata (built-in, Bluetooth or other virtual COM
+        # ports) are skipped as well.
+        if not (connection.USB_IDS or connection.USB_MANUFACTURERS):
+            return True
+        if port.vid is None:
+            return False
+        if (connection.USB_IDS
+                and (port.vid, port.pid) not in connection.USB_IDS):
+            return False
+        if connection.USB_MANUFACTURERS and not any(
+                m.casefold() in (port.manufacturer or '').casefold()
+                for m in connection.USB_MANUFACTURERS):
+            return False
+        return True
+
+    def _probe_usb_port(device: str, timeout: float):
+        try:
+            with serial.Serial(device,
+                               timeout=timeout,
+                               write_timeout=timeout) as conn:
+                conn.write('*IDN?\r\n'.encode())
+                buffer = conn.read_until('\r\n'.encode())
+
+                data = buffer.decode().strip().split(',')
+                company = data[0]
+                model = data[1]
+                serial_num = data[2]
+
+                if company == 'Instec' and model.startswith(('MK2000', 'MAGNET')):
+                    return serial_num, device
+        except Exception:
             pass
+        return None
 
-        sock.close()
-
-        return controller.ethernet
+    def get_usb_controllers(timeout: float = None):
+        """Get all controllers connected via USB. Ports can be filtered by
+        their USB metadata (see connection.USB_IDS and
+        connection.USB_MANUFACTURERS), and the remaining ports are probed
+        concurrently.
 
-    def get_usb_controllers():
-        """Get all controllers connected via USB.
+        Args:
+            timeout (float, optional):  Time to wait for all ports to
+                                        respond in seconds. Defaults to
+                                        connection.TIMEOUT.
 
         Returns:
             List: List of tuples in the form (serial_num, port)
         """
-        ports = list_ports.comports()
         controller.usb = []
-        for port in ports:
-            try:
-                with serial.Serial(port.device,
-                                   timeout=connection.TIMEOUT,
-                                   write_timeout=connection.TIMEOUT) as conn:
-                    conn.write('*IDN?\r\n'.encode())
-                    buffer = conn.read_until('\r\n'.encode())
-
-                    data = buffer.decode().strip().split(',')
-                    company = data[0]
-                    model = data[1]
-                    serial_num = data[2]
-
-                    if company == 'Instec' and model.startswith(('MK2000', 'MAGNET')):
-                        controller.usb.append((serial_num, port.device))
-            except Exception:
-                continue
+        return list(controller.iter_usb_controllers(timeout=timeout))
 
-        return controller.usb
+    def iter_usb_controllers(serial_num: str = None, count: int = None,
+                             timeout: float = None):
+        """Yield controllers connected via USB as soon as their port
+        responds. Ports are probed concurrently, and discovery stops early
+        once the controller with serial_num or count controllers have been
+        found.
 
-    def _get_controller_by_serial_number(self, serial_num: str):
-        """Find the controller connection info by serial number.
+        Args:
+            serial_num (str, optional): Only yield the controller with this
+                                        serial number. Defaults to None.
+            count (int, optional):      Number of controllers to find.
+                                        Defaults to None.
+            timeout (float, optional):  Time to wait for all ports to
+                                        respond in seconds. Defaults to
+                                        connection.TIMEOUT.
+
+        Yields:
+            tuple: Tuple in the form (serial_num, port)
+        """
+        timeout = connection.TIMEOUT if timeout is None else timeout
+        ports = [port.device for port in list_ports.comports()
+                 if controller._is_usb_candidate(port)]
+        if not ports:
+            return
+
+        # One thread per port, so that every probe starts right away and
+        # finishes within the same timeout.
+        found = 0
+        executor = ThreadPoolExecutor(max_workers=len(ports))
+        futures = [executor.submit(controller._probe_usb_port, port, timeout)
+                   for port in ports]
+        try:
+            for future in as_completed(futures, timeout):
+                result = future.result()
+                if result is None:
+                    continue
+                if result not in controller.usb:
+                    controller.usb.append(result)
+                if serial_num is not None and result[0] != serial_num:
+                    continue
+
+                yield result
+                found += 1
+                if serial_num is not None or found == count:
+                    return
+        except FuturesTimeoutError:
+            pass
+        finally:
+            # Ports that have not answered by the deadline are abandoned,
+            # their probes end on their own serial timeout.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_controller_by_serial_number(self, serial_num: str,
+                                         cached: bool = True):
+        """Find the controller connection info by serial number. The
+        discovery cache is checked before discovering controllers (see
+        connection.CACHE_PATH).
 
         Args:
             serial_num (str): Serial number of the controller.
+            cached (bool, optional):    Whether the discovery cache can be
+                                        used. Defaults to True.
 
         Raises:
             ValueError: If a controller with the serial number is not found.
@@ -121,27 +313,35 @@ class controller:
                   is either the port (USB) or IP address (Ethernet)
         """
 
-        if self._mode in [mode.USB, None]:
-            try:
-                for c in controller.usb:
+        for c_mode, found in [(mode.USB, controller.usb),
+                              (mode.ETHERNET, controller.ethernet)]:
+            if self._mode in [c_mode, None]:
+                for c in found:
                     if c[0] == serial_num:
-                        self._mode = mode.USB
+                        self._mode = c_mode
                         return c[1]
-                for c in controller.get_usb_controllers():
+        if cached:
+            entry = discovery_cache.lookup(serial_num)
+            if entry is not None and self._mode in [entry[0], None]:
+                self._mode = entry[0]
+                self._cached_serial = serial_num
+                return entry[1]
+        if self._mode in [mode.USB, None]:
+            try:
+                for c in controller.iter_usb_controllers(serial_num):
                     if c[0] == serial_num:
                         self._mode = mode.USB
+                        discovery_cache.store(serial_num, mode.USB, c[1])
                         return c[1]
             except TypeError:
                 pass
         if self._mode in [mode.ETHERNET, None]:
             try:
-                for c in controller.ethernet:
-                    if c[0] == serial_num:
-                        self._mode = mode.ETHERNET
-                        return c[1]
-                for c in controller.get_ethernet_controllers():
+                for c in controller.iter_ethernet_controllers(serial_num):
                     if c[0] == serial_num:
                         self._mode = mode.ETHERNET
+                        discovery_cache.store(serial_num, mode.ETHERNET,
+                                              c[1])
                         return c[1]
             except TypeError:
                 pass
@@ -171,6 +371,11 @@ class controller:
             ValueError: If invalid connection mode is given.
         """
         self._mode = conn_mode
+        self._requested_mode = conn_mode
+        self._baudrate = baudrate
+        self._cached_serial = None
+        self._buffer = _receive_buffer()
+        self._lock = threading.Lock()
         if isinstance(serial_num, str):
             param = self._get_controller_by_serial_number(serial_num)
             if self._mode == mode.USB:
@@ -178,10 +383,13 @@ class controller:
             elif self._mode == mode.ETHERNET:
                 ip = param
 
+        self._configure(port, ip)
+
+    def _configure(self, port: str, ip: str):
         if self._mode == mode.USB:
             self._usb = serial.Serial()
-            if isinstance(baudrate, int):
-                self._usb.baudrate = baudrate
+            if isinstance(self._baudrate, int):
+                self._usb.baudrate = self._baudrate
             else:
                 raise ValueError('Invalid baud rate')
             if isinstance(port, str):
@@ -194,8 +402,45 @@ class controller:
         else:
             raise ValueError('Invalid connection mode')
 
+    def _rediscover(self, serial_num: str):
+        """Discover the controller again after the cached entry for
+        serial_num turned out to be stale.
+        """
+        discovery_cache.remove(serial_num)
+        self._mode = self._requested_mode
+        param = self._get_controller_by_serial_number(serial_num, False)
+        if self._mode == mode.USB:
+            self._configure(param, None)
+        else:
+            self._configure(None, param)
+
+    def _is_controller(self, serial_num: str):
+        """Check that the connected controller has serial_num.
+        """
+        # The serial port blocks without a timeout, so a silent device at
+        # the cached port would otherwise block connect() forever.
+        if self._mode == mode.USB:
+            timeouts = self._usb.timeout, self._usb.write_timeout
+            self._usb.timeout = connection.TIMEOUT
+            self._usb.write_timeout = connection.TIMEOUT
+        try:
+            data = self._send_command('*IDN?').strip().split(',')
+            if len(data) > 2 and data[2] == serial_num:
+                return True
+            # Some models (e.g. MK2000VCP) do not return the serial number
+            # from *IDN?, so fall back on querying it directly.
+            return self._send_command('TEMP:SNUM?').strip() == serial_num
+        except Exception:
+            return False
+        finally:
+            if self._mode == mode.USB:
+                self._usb.timeout, self._usb.write_timeout = timeouts
+
     def connect(self):
-        """Connect to controller via selected connection mode.
+        """Connect to controller via selected connection mode. If the
+        controller was found in the discovery cache, its serial number is
+        checked first and the controller is discovered again if the cached
+        address is stale.
 
         Raises:
             RuntimeError:   If unable to connect via COM port.
@@ -203,6 +448,25 @@ class controller:
             RuntimeError:   If TCP connection cannot be established.
             ValueError:     If invalid connection mode is given.
         """
+        if self._cached_serial is None:
+            self._open()
+            return
+
+        # The address was found in the discovery cache, so check that the
+        # same controller is still there before using it.
+        serial_num, self._cached_serial = self._cached_serial, None
+        try:
+            self._open()
+            if self._is_controller(serial_num):
+                return
+            self.disconnect()
+        except RuntimeError:
+            pass
+        self._rediscover(serial_num)
+        self._open()
+
+    def _open(self):
+        self._buffer.clear()
         if self._mode == mode.USB:
             try:
                 self._usb.open()
@@ -251,40 +515,45 @@ class controller:
         if self._mode == mode.USB:
             return self._usb.is_open
         elif self._mode == mode.ETHERNET:
-            try:
-                timeout = self._tcp_socket.gettimeout()
-                self._tcp_socket.settimeout(0)
-                if sys.platform.startswith('win32'):
-                    data = self._tcp_socket.recv(16, socket.MSG_PEEK)
-                else:
-                    data = self._tcp_socket.recv(16,
-                                                 socket.MSG_DONTWAIT
-                                                 | socket.MSG_PEEK)
-                if len(data) == 0:
-                    return False
-            except BlockingIOError:
-                return True
-            except ConnectionResetError:
-                return False
-            except OSError:
-                return False
-            except ValueError:
-                return False
-            except Exception as error:
-                raise RuntimeError('Unknown exception occured') from error
-            finally:
+            # Peeking changes the socket timeout, so it must not overlap
+            # with an exchange running in another thread.
+            with self._lock:
                 try:
-                    self._tcp_socket.settimeout(timeout)
+                    timeout = self._tcp_socket.gettimeout()
+                    self._tcp_socket.settimeout(0)
+                    if sys.platform.startswith('win32'):
+                        data = self._tcp_socket.recv(16, socket.MSG_PEEK)
+                    else:
+                        data = self._tcp_socket.recv(16,
+                                                     socket.MSG_DONTWAIT
+                                                     | socket.MSG_PEEK)
+                    if len(data) == 0:
+                        return False
+                except BlockingIOError:
+                    return True
+                except ConnectionResetError:
+                    return False
                 except OSError:
-                    pass
-                except AttributeError:
                     return False
+                except ValueError:
+                    return False
+                except Exception as error:
+                    raise RuntimeError('Unknown exception occured') from error
+                finally:
+                    try:
+                        self._tcp_socket.settimeout(timeout)
+                    except OSError:
+                        pass
+                    except AttributeError:
+                        return False
         else:
             raise ValueError('Invalid connection mode')
 
     def _send_command(self, command, returns=True):
         """Internal function to process and send SCPI commands via the
-        desired communication method.
+        desired communication method. Each exchange holds the connection
+        lock from sending the command until the response is received, so
+        one connected controller can be shared between threads.
 
         Args:
             command (str):              The command to run in SCPI format.
@@ -298,16 +567,22 @@ class controller:
         Returns:
             str: None if returns is False, otherwise the value from recv.
         """
+        with self._lock:
+            return self._exchange(command, returns)
+
+    def _exchange(self, command, returns):
         if self._mode == mode.USB:
             self._usb.write(str.encode(f'{command}\n'))
             if returns:
-                buffer = self._usb.readline().decode()
-                # Buffer must check if the returned string ends with \r\n,
-                # otherwise it is possible the entire result was not sent
-                # and readline should be called until the entire result is
-                # received.
-                while not buffer.endswith('\r\n'):
-                    buffer += self._usb.readline().decode()
+                # The response is complete once \r\n is received,
+                # otherwise more of it has to be read from the port.
+                buffer = self._buffer.next_frame()
+                while buffer is None:
+                    data = self._usb.read(self._usb.in_waiting or 1)
+                    if not data:
+                        raise RuntimeError('Unable to receive response')
+                    self._buffer.feed(data)
+                    buffer = self._buffer.next_frame()
                 return buffer
             else:
                 return None
@@ -315,13 +590,13 @@ class controller:
             self._tcp_socket.send(str.encode(f'{command}\n'))
             if returns:
                 try:
-                    buffer = self._tcp_socket.recv(1024).decode()
-                    # Buffer must check if the returned string ends with \r\n,
-                    # otherwise it is possible the entire result was not sent
-                    # and recv should be called until the entire result is
-                    # received.
-                    while not buffer.endswith('\r\n'):
-                        buffer += self._tcp_socket.recv(1024).decode()
+                    # The response is complete once \r\n is received,
+                    # otherwise recv should be called until the entire
+                    # result is received.
+                    buffer = self._buffer.next_frame()
+                    while buffer is None:
+                        self._buffer.recv_from(self._tcp_socket)
+                        buffer = self._buffer.next_frame()
                     return buffer
                 except Exception as error:
                     raise RuntimeError('Unable to receive response') from error
@@ -329,3 +604,44 @@ class controller:
                 return None
         else:
             raise ValueError('Invalid connection mode')
+
+    def _send_commands(self, commands):
+        """Internal function to send several SCPI queries as compound
+        commands, so that they are answered in as few exchanges as
+        possible. At most connection.COMPOUND_LIMIT queries are joined
+        into each compound command.
+
+        Args:
+            commands (list): The queries to run in SCPI format.
+
+        Raises:
+            RuntimeError: If the number of responses does not match the
+                          number of queries.
+
+        Returns:
+            list: The response of each query, in the same order.
+        """
+        responses = []
+        for start in range(0, len(commands), connection.COMPOUND_LIMIT):
+            chunk = commands[start:start + connection.COMPOUND_LIMIT]
+            if len(chunk) == 1:
+                responses.append(self._send_command(chunk[0]))
+            else:
+                responses.extend(controller._split_response(
+                    self._send_command(controller._join_commands(chunk)),
+                    len(chunk)))
+        return responses
+
+    def _join_commands(commands):
+        # Every query after the first is rooted with a leading colon,
+        # since SCPI otherwise resolves it relative to the subsystem of
+        # the previous query. Common commands (*IDN? etc.) are global.
+        return ';'.join([commands[0]] + [
+            c if c.startswith(('*', ':')) else f':{c}'
+            for c in commands[1:]])
+
+    def _split_response(response, count):
+        data = response.strip().split(';')
+        if len(data) != count:
+            raise RuntimeError('Unexpected response to compound command')
+        return data
@@ -0,0 +1,96 @@
+"""Persistent cache of discovered controllers, so that scripts connecting
+by serial number do not need to discover controllers every time they run.
+"""
+
+import json
+import os
+import time
+from instec.constants import mode, connection
+
+
+class discovery_cache:
+    """Functions to read and update the discovery cache, a JSON file at
+    connection.CACHE_PATH that maps each serial number to the connection
+    mode and address (port or IP address) of the controller. Entries expire
+    after connection.CACHE_TTL seconds. The cache is disabled while
+    connection.CACHE_PATH is None.
+    """
+
+    def _load():
+        try:
+            with open(connection.CACHE_PATH) as file:
+                entries = json.load(file)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(entries: dict):
+        # Write to a temporary file first so that other processes never
+        # read a partially written cache.
+        path = os.fspath(connection.CACHE_PATH)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w') as file:
+                json.dump(entries, file, indent=4)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def lookup(serial_num: str):
+        """Get the cached connection info of a controller.
+
+        Args:
+            serial_num (str): Serial number of the controller.
+
+        Returns:
+            tuple: Tuple in the form (mode, param), where param is either the
+                   port (USB) or IP address (Ethernet), or None if there is
+                   no valid entry.
+        """
+        if connection.CACHE_PATH is None:
+            return None
+        entry = discovery_cache._load().get(serial_num)
+        try:
+            if time.time() - entry['time'] > connection.CACHE_TTL:
+                return None
+            return mode[entry['mode']], entry['address']
+        except (TypeError, KeyError):
+            return None
+
+    def store(serial_num: str, conn_mode: mode, param: str):
+        """Add or replace the cache entry of a controller.
+
+        Args:
+            serial_num (str): Serial number of the controller.
+            conn_mode (mode): USB or Ethernet connection mode.
+            param (str): Port (USB) or IP address (Ethernet).
+        """
+        if connection.CACHE_PATH is None:
+            return
+        entries = discovery_cache._load()
+        entries[serial_num] = {'mode': conn_mode.name,
+                               'address': param,
+                               'time': time.time()}
+        discovery_cache._save(entries)
+
+    def remove(serial_num: str):
+        """Remove the cache entry of a controller, if it exists.
+
+        Args:
+            serial_num (str): Serial number of the controller.
+        """
+        if connection.CACHE_PATH is None:
+            return
+        entries = discovery_cache._load()
+        if entries.pop(serial_num, None) is not None:
+            discovery_cache._save(entries)
+
+    def clear():
+        """Remove all entries from the cache.
+        """
+        if connection.CACHE_PATH is None:
+            return
+        discovery_cache._save({})
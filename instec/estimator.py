@@ -0,0 +1,229 @@
+"""Classes that predict when PV will reach TSP, from the samples of a
+Sampler or while waiting for PV to settle.
+"""
+
+import math
+import threading
+from collections import deque
+from statistics import NormalDist
+from instec.records import RuntimeInfo, EtaEstimate, SettleStats
+from instec.constants import system_status
+
+
+class EtaEstimator:
+    """Fits a line to recent PV samples with exponentially weighted least
+    squares, updated incrementally with every sample, and extrapolates it
+    to TSP. Older samples lose half their weight every window seconds, so
+    the slope follows changes of the ramp rate or heating power. The fit
+    starts over whenever the TSP or system status changes.
+    """
+
+    def __init__(self, window: float = 30, tolerance: float = 0.1):
+        """Initialize the estimator.
+
+        Args:
+            window (float, optional):   Half-life of the weight of a sample
+                                        in seconds. Defaults to 30.
+            tolerance (float, optional):    Largest difference between PV
+                                            and TSP that counts as reached.
+                                            Defaults to 0.1.
+
+        Raises:
+            ValueError: If window is not positive.
+        """
+        if window <= 0:
+            raise ValueError('Window must be positive')
+        self._tau = window / math.log(2)
+        self._tolerance = tolerance
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard all samples.
+        """
+        with self._lock:
+            self._start = None
+            self._last = None
+            self._info = None
+            # Weighted sums of 1, t, pv, t^2, t*pv, pv^2 and weight^2
+            self._sums = [0.0] * 7
+
+    def update(self, timestamp: float, info: RuntimeInfo):
+        """Add a sample to the fit.
+
+        Args:
+            timestamp (float):  time.time() of the sample.
+            info (RuntimeInfo): The sample.
+        """
+        with self._lock:
+            if (self._info is None or info.tsp != self._info.tsp
+                    or info.s_status != self._info.s_status):
+                self._start = timestamp
+                self._last = timestamp
+                self._sums = [0.0] * 7
+            t = timestamp - self._start
+            decay = math.exp(-(timestamp - self._last) / self._tau)
+            sums = self._sums
+            for index in range(6):
+                sums[index] *= decay
+            sums[6] *= decay * decay
+            pv = info.pv
+            sums[0] += 1
+            sums[1] += t
+            sums[2] += pv
+            sums[3] += t * t
+            sums[4] += t * pv
+            sums[5] += pv * pv
+            sums[6] += 1
+            self._last = timestamp
+            self._info = info
+
+    def estimate(self, confidence: float = 0.95):
+        """Get the expected time until PV reaches TSP.
+
+        Args:
+            confidence (float, optional):   Confidence level of the interval.
+                                            Defaults to 0.95.
+
+        Raises:
+            ValueError: If confidence is not between 0 and 1.
+
+        Returns:
+            EtaEstimate: Expected seconds until TSP is reached with the
+                         bounds of the confidence interval and the slope of
+                         PV in degrees per second, or None if the controller
+                         is not in RAMP or HOLD, too few samples have been
+                         taken, or PV is not moving towards TSP.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError('Confidence must be between 0 and 1')
+        with self._lock:
+            info = self._info
+            if info is None or info.s_status not in (system_status.RAMP,
+                                                     system_status.HOLD):
+                return None
+            s0, st, sp, stt, stp, spp, w2 = self._sums
+            t = self._last - self._start
+
+        sxx = stt - st * st / s0
+        if s0 * s0 / w2 <= 2 or sxx <= 0:
+            if abs(info.tsp - info.pv) <= self._tolerance:
+                return EtaEstimate(0.0, 0.0, 0.0, 0.0)
+            return None
+        slope = (stp - st * sp / s0) / sxx
+        pv = sp / s0 + slope * (t - st / s0)
+        distance = info.tsp - pv
+        if abs(distance) <= self._tolerance:
+            return EtaEstimate(0.0, 0.0, 0.0, slope)
+
+        # Standard error of the slope, using the effective sample size of
+        # the weighted samples
+        sse = max(spp - sp * sp / s0 - slope * (stp - st * sp / s0), 0.0)
+        n = s0 * s0 / w2
+        error = math.sqrt(sse / (n - 2) / sxx)
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+        speed = slope if distance > 0 else -slope
+        if speed <= 0:
+            return None
+        distance = abs(distance)
+        low = distance / (speed + z * error)
+        high = (distance / (speed - z * error)
+                if speed > z * error else math.inf)
+        return EtaEstimate(distance / speed, low, high, slope)
+
+
+class _settle_tracker:
+    """Tracks the PV of one controller until it settles at TSP, and
+    predicts how long to wait before checking it again. Used by
+    wait_until_settled() and wait_all_settled().
+
+    Outside of a RAMP, the rate PV approaches TSP at is the slope of a line
+    fitted to the last SAMPLES checks. The prediction is only used if that
+    rate is clearly above the noise of the fit; otherwise PV is checked
+    every interval. The delay never exceeds MAX_DELAY seconds (or interval,
+    if that is longer), so a wrong prediction costs at most a few seconds.
+    """
+    SAMPLES = 8
+    MAX_DELAY = 5.0
+
+    def __init__(self, tsp: float, tolerance: float, stable_for: float,
+                 start: float):
+        self._tsp = tsp
+        self._tolerance = tolerance
+        self._stable_for = stable_for
+        self._start = start
+        self._samples = 0
+        self._direction = None
+        self._overshoot = 0.0
+        self._time_to_band = None
+        self._stable_since = None
+        self._deviation = 0.0
+        self._history = deque(maxlen=self.SAMPLES)
+        self.delay = 0.0
+
+    def update(self, info: RuntimeInfo, now: float, interval: float):
+        """Add a check of the controller, and set delay to the time until
+        the next check.
+
+        Returns:
+            SettleStats: Statistics of the wait once PV has settled,
+                         otherwise None.
+        """
+        self._samples += 1
+        self._history.append((now, info.pv))
+        distance = info.pv - (info.tsp if self._tsp is None else self._tsp)
+        if self._direction is None:
+            self._direction = (distance > 0) - (distance < 0)
+        self._overshoot = max(self._overshoot, -distance * self._direction)
+
+        if abs(distance) <= self._tolerance:
+            if self._time_to_band is None:
+                self._time_to_band = now - self._start
+            if self._stable_since is None:
+                self._stable_since = now
+                self._deviation = 0.0
+            self._deviation = max(self._deviation, abs(distance))
+            if now - self._stable_since >= self._stable_for:
+                return SettleStats(now - self._start, self._time_to_band,
+                                   self._overshoot, self._deviation,
+                                   info.pv, self._samples)
+            self.delay = min(interval,
+                             self._stable_since + self._stable_for - now)
+        else:
+            # Sleep for part of the predicted time, so the prediction is
+            # corrected as PV gets closer
+            self._stable_since = None
+            predicted = self._predict(distance, info)
+            self.delay = min(max(interval, 0.5 * predicted),
+                             max(interval, self.MAX_DELAY))
+        return None
+
+    def _predict(self, distance: float, info: RuntimeInfo):
+        # Seconds until PV is within tolerance, at the ramp rate
+        # (°C/minute) while ramping, otherwise at the fitted rate towards
+        # TSP. Zero if no reliable rate is known.
+        remaining = abs(distance) - self._tolerance
+        if info.s_status == system_status.RAMP and info.rt > 0:
+            return remaining / info.rt * 60
+        rate = _settle_tracker._approach_rate(self._history, distance)
+        return remaining / rate if rate > 0 else 0
+
+    def _approach_rate(history, distance: float):
+        # Least squares slope of PV over the checks in history, signed so
+        # that moving towards TSP is positive. Zero if there are too few
+        # checks or the slope is within three standard errors of zero.
+        n = len(history)
+        if n < 3:
+            return 0.0
+        mean_t = sum(t for t, _ in history) / n
+        mean_pv = sum(pv for _, pv in history) / n
+        sxx = sum((t - mean_t) ** 2 for t, _ in history)
+        if sxx <= 0:
+            return 0.0
+        slope = sum((t - mean_t) * (pv - mean_pv) for t, pv in history) / sxx
+        sse = sum((pv - mean_pv - slope * (t - mean_t)) ** 2
+                  for t, pv in history)
+        error = math.sqrt(sse / (n - 2) / sxx)
+        rate = -slope if distance > 0 else slope
+        return rate if rate > 3 * error else 0.0
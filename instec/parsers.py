@@ -0,0 +1,84 @@
+"""Parsers for responses that are shared between command sets.
+"""
+
+import re
+from instec.constants import system_status, profile_status
+from instec.records import RuntimeInfo
+
+
+class parse:
+    """Functions to parse raw responses from the controller.
+    """
+    # Enum lookup tables, so parsing does not construct enums by value
+    SYSTEM_STATUS = {status.value: status for status in system_status}
+    # MK2000VCP reports some system statuses with different codes
+    VCP_SYSTEM_STATUS = {**SYSTEM_STATUS,
+                         5: system_status.STOP,
+                         21: system_status.RPP}
+    PROFILE_STATUS = {status.value: status for status in profile_status}
+    # Comma separated list of decimal numbers
+    VALUES = re.compile(r'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+                        r'(?:\s*,\s*[-+]?(?:\d+\.?\d*|\.\d+)'
+                        r'(?:[eE][-+]?\d+)?)*\s*')
+
+    def values(values_raw: str, out=None):
+        """Parse a comma separated list of values, such as the response to
+        TEMP:CTEM?, TEMP:MTEM? or TEMP:PTEM?.
+
+        Args:
+            values_raw (str): Raw response from the controller.
+            out (optional): Preallocated buffer, such as an array('d') or
+                            NumPy array, that the values are written to
+                            instead of returning a tuple. Defaults to None.
+
+        Raises:
+            RuntimeError: If the response is malformed.
+            ValueError: If out is too small to hold all values.
+
+        Returns:
+            (float tuple): The values, or out if it was given.
+        """
+        if parse.VALUES.fullmatch(values_raw) is None:
+            raise RuntimeError(f'Malformed list of values: {values_raw!r}')
+        values = values_raw.split(',')
+        if out is None:
+            return tuple(map(float, values))
+        if len(out) < len(values):
+            raise ValueError('Buffer is too small for all values')
+        for index, value in enumerate(values):
+            out[index] = float(value)
+        return out
+
+    def runtime_information(rtin_raw: str,
+                            status_table: dict = SYSTEM_STATUS,
+                            error_supported: bool = True) -> RuntimeInfo:
+        """Parse the response to TEMP:RTIN?.
+
+        Args:
+            rtin_raw (str): Raw response from the controller.
+            status_table (dict, optional):  Map of system status codes to
+                                            system_status.
+                                            Defaults to SYSTEM_STATUS.
+            error_supported (bool, optional):   Whether the response has an
+                                                error code, otherwise the
+                                                error code is -1.
+                                                Defaults to True.
+
+        Raises:
+            RuntimeError: If the response is malformed.
+
+        Returns:
+            RuntimeInfo: The runtime information.
+        """
+        try:
+            rtin = rtin_raw[rtin_raw.index('MK') + 2:].split(':')
+            p_status, p, i = rtin[9].split(',')
+            return RuntimeInfo(
+                int(rtin[1]), float(rtin[2]), float(rtin[3]),
+                float(rtin[4]), float(rtin[5]), float(rtin[6]),
+                float(rtin[7]), status_table[int(rtin[8])],
+                parse.PROFILE_STATUS[int(p_status)], int(p), int(i),
+                int(rtin[10]) if error_supported else -1)
+        except (ValueError, IndexError, KeyError) as error:
+            raise RuntimeError(
+                f'Malformed runtime information: {rtin_raw!r}') from error
@@ -0,0 +1,213 @@
+"""Poller class that queries many controllers at once from a single
+thread.
+"""
+
+import os
+import selectors
+import time
+from instec.constants import mode, connection
+from instec.estimator import _settle_tracker
+
+
+class ControllerPoller:
+    """Sends TEMP:RTIN? to every controller at once and collects the
+    responses as they arrive, so polling N controllers costs roughly one
+    round trip instead of N. Controllers connected via USB can be polled
+    on POSIX systems, where serial ports can be watched like sockets.
+    """
+
+    def __init__(self, controllers: list):
+        """Initialize the poller with connected controllers.
+
+        Args:
+            controllers (list): MK2000B/MK2000VCP instances connected
+                                via Ethernet, or via USB on POSIX systems.
+
+        Raises:
+            ValueError: If a controller is connected via USB on a system
+                        that is not POSIX.
+            ValueError: If a connection is given more than once.
+        """
+        self._controllers = list(controllers)
+        for c in self._controllers:
+            if c._controller._mode == mode.USB and os.name != 'posix':
+                raise ValueError('USB controllers can only be polled '
+                                 'on POSIX systems')
+        if len({id(c._controller) for c in self._controllers}) != len(
+                self._controllers):
+            raise ValueError('Controller connection given more than once')
+        self._selector = selectors.DefaultSelector()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the selector used by the poller.
+        """
+        self._selector.close()
+
+    def get_runtime_information(self, timeout: float = None) -> list:
+        """Return the runtime information of every controller, in the same
+        order as the controllers were given. See get_runtime_information()
+        of the command set for a description of each value.
+
+        Args:
+            timeout (float, optional):  Time to wait for all responses in
+                                        seconds. Defaults to
+                                        connection.TIMEOUT.
+
+        Returns:
+            list: Runtime information tuple of each controller, or None
+                  for controllers that did not respond in time.
+        """
+        return self._poll(range(len(self._controllers)), timeout)
+
+    def _poll(self, indices, timeout: float = None) -> list:
+        """Poll the controllers at the given indices, and return their
+        runtime information in the same order.
+        """
+        timeout = connection.TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        indices = list(indices)
+        results = {index: None for index in indices}
+
+        # Hold the lock of every connection for the whole exchange so that
+        # no other thread reads a response meant for the poller. Locks are
+        # always taken in the same order to avoid deadlocks.
+        connections = sorted({id(self._controllers[index]._controller):
+                              self._controllers[index]._controller
+                              for index in indices}.items())
+        locked = []
+        try:
+            for _, conn in connections:
+                conn._lock.acquire()
+                locked.append(conn)
+
+            for index in indices:
+                conn = self._controllers[index]._controller
+                if conn._mode == mode.USB:
+                    conn._usb.write(b'TEMP:RTIN?\n')
+                    port = conn._usb
+                else:
+                    conn._tcp_socket.send(b'TEMP:RTIN?\n')
+                    port = conn._tcp_socket
+                self._selector.register(port, selectors.EVENT_READ, index)
+
+            while self._selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in self._selector.select(remaining):
+                    index = key.data
+                    c = self._controllers[index]
+                    try:
+                        ControllerPoller._receive(c._controller, key.fileobj)
+                    except OSError:
+                        self._selector.unregister(key.fileobj)
+                        c._controller._buffer.discard_next()
+                        continue
+                    rtin_raw = c._controller._buffer.next_frame()
+                    if rtin_raw is not None:
+                        self._selector.unregister(key.fileobj)
+                        results[index] = c._parse_runtime_information(
+                            rtin_raw)
+        finally:
+            # The responses of controllers that did not answer in time
+            # arrive later, and must not be read as the response to the
+            # next command sent on the same connection.
+            for key in list(self._selector.get_map().values()):
+                self._selector.unregister(key.fileobj)
+                self._controllers[key.data]._controller._buffer.discard_next()
+            for conn in locked:
+                conn._lock.release()
+
+        return [results[index] for index in indices]
+
+    def _receive(conn, port):
+        if conn._mode == mode.USB:
+            data = port.read(port.in_waiting or 1)
+            if not data:
+                raise ConnectionError('No data received from controller')
+            conn._buffer.feed(data)
+        else:
+            conn._buffer.recv_from(port)
+
+
+def wait_all_settled(controllers: list, tolerances=0.1, timeout: float = None,
+                     tsps=None, stable_for: float = 0,
+                     interval: float = 0.25) -> list:
+    """Wait until PV of every controller is within tolerance of its TSP
+    (see wait_until_settled() of the command set). All controllers are
+    checked at once with a ControllerPoller, and controllers that settled
+    are no longer checked, so the total wait is that of the slowest
+    controller.
+
+    Args:
+        controllers (list): MK2000B/MK2000VCP instances, see
+                            ControllerPoller.
+        tolerances (float or list, optional):   Largest difference between
+                                                PV and TSP that counts as
+                                                settled, for all or each
+                                                controller. Defaults to 0.1.
+        timeout (float, optional):  Longest time to wait in seconds.
+                                    Defaults to None (no limit).
+        tsps (list, optional):      Target temperature of each controller.
+                                    Defaults to the current TSP of each
+                                    controller.
+        stable_for (float, optional):   Time in seconds PV must stay within
+                                        tolerance. Defaults to 0.
+        interval (float, optional): Time between checks near the target
+                                    in seconds. Defaults to 0.25.
+
+    Raises:
+        ValueError: If the number of tolerances or TSPs does not match the
+                    number of controllers.
+        ValueError: If a tolerance, stable_for or interval is invalid.
+        ValueError: If a controller cannot be polled, see ControllerPoller.
+
+    Returns:
+        list: SettleStats of each controller, in the same order as the
+              controllers were given, or None for controllers that did not
+              settle within timeout.
+    """
+    controllers = list(controllers)
+    count = len(controllers)
+    if isinstance(tolerances, (int, float)):
+        tolerances = [tolerances] * count
+    tsps = [None] * count if tsps is None else list(tsps)
+    if len(tolerances) != count or len(tsps) != count:
+        raise ValueError('Expected one tolerance and TSP per controller')
+    if min(tolerances, default=0) < 0 or stable_for < 0:
+        raise ValueError('Tolerance and stable time must not be negative')
+    if interval <= 0:
+        raise ValueError('Interval must be positive')
+
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    trackers = [_settle_tracker(tsp, tolerance, stable_for, start)
+                for tsp, tolerance in zip(tsps, tolerances)]
+    results = [None] * count
+    with ControllerPoller(controllers) as poller:
+        while True:
+            pending = [index for index in range(count)
+                       if results[index] is None]
+            infos = poller._poll(pending)
+            now = time.monotonic()
+            for index, info in zip(pending, infos):
+                trackers[index].delay = interval
+                if info is not None:
+                    results[index] = trackers[index].update(info, now,
+                                                            interval)
+
+            pending = [index for index in pending if results[index] is None]
+            if not pending:
+                return results
+            delay = min(trackers[index].delay for index in pending)
+            if deadline is not None:
+                if now >= deadline:
+                    return results
+                delay = min(delay, deadline - now)
+            time.sleep(delay)
@@ -3,6 +3,7 @@
 
 from abc import ABC, abstractmethod
 from instec.constants import profile_status, profile_item
+from instec.records import ProfileItem, Profile
 
 
 class profile(ABC):
@@ -111,7 +112,7 @@ class profile(ABC):
         pass
 
     @abstractmethod
-    def get_profile_item(self, p: int, i: int) -> None:
+    def get_profile_item(self, p: int, i: int) -> ProfileItem:
         """Get the selected item from the selected profile.
         Profiles are zero-indexed, ranging from 0 to 4, inclusive, but
         the default names are one-indexed (i.e. 0 corresponds with
@@ -123,7 +124,7 @@ class profile(ABC):
             i (int): Selected item index
 
         Returns:
-            (profile_item, float, float): Profile item tuple
+            ProfileItem: Profile item tuple
         """
         pass
 
@@ -173,6 +174,23 @@ class profile(ABC):
         """
         pass
 
+    @abstractmethod
+    def read_profile(self, p: int) -> Profile:
+        """Get the name and every item of the selected profile. The name,
+        item count and items are queried with compound commands, so the
+        whole profile is read in a few exchanges instead of one per item.
+
+        Args:
+            p (int): Selected profile
+
+        Raises:
+            ValueError: If profile is invalid
+
+        Returns:
+            Profile: Profile name, item count and items
+        """
+        pass
+
     @abstractmethod
     def set_profile_name(self, p: int, name: str) -> None:
         """Set the profile name of the selected profile.
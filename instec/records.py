@@ -0,0 +1,91 @@
+"""Record types returned by the command sets.
+"""
+
+from typing import NamedTuple
+from instec.constants import (unit, system_status, profile_status,
+                              profile_item)
+
+
+class DeviceInfo(NamedTuple):
+    """Static information about a controller, which does not change while
+    it is connected. Values not supported by the controller are None.
+    """
+    company: str
+    model: str
+    serial: str
+    firmware: str
+    slave_count: int
+    precision: tuple[int, int] | None
+    pv_unit: unit | None
+    mv_unit: unit | None
+    stage_range: tuple[float, float] | None
+    default_operation_range: tuple[float, float] | None
+
+
+class RuntimeInfo(NamedTuple):
+    """Runtime information of a controller, as returned by TEMP:RTIN?.
+    See get_runtime_information() for a description of each value.
+    """
+    sx: int
+    pv: float
+    mv: float
+    tsp: float
+    csp: float
+    rt: float
+    pp: float
+    s_status: system_status
+    p_status: profile_status
+    p: int
+    i: int
+    error_status: int
+
+
+class Event(NamedTuple):
+    """Change between two samples of a Sampler, passed to the callbacks
+    registered with on(). See on() for the values of each event.
+    """
+    name: str
+    time: float
+    old: object
+    new: object
+    info: RuntimeInfo
+
+
+class SettleStats(NamedTuple):
+    """Statistics of a wait_until_settled() call. Times are in seconds
+    from the start of the call.
+    """
+    elapsed: float
+    time_to_band: float
+    overshoot: float
+    max_deviation: float
+    pv: float
+    samples: int
+
+
+class EtaEstimate(NamedTuple):
+    """Expected time until PV reaches TSP, in seconds from the last sample,
+    with the bounds of its confidence interval. The slope of PV is in
+    degrees per second.
+    """
+    seconds: float
+    low: float
+    high: float
+    slope: float
+
+
+class ProfileItem(NamedTuple):
+    """Item of a profile, as returned by get_profile_item(). Parameters
+    not used by the item instruction are None.
+    """
+    item: profile_item
+    b1: float | None
+    b2: float | None
+
+
+class Profile(NamedTuple):
+    """Name and items of a profile, as returned by read_profile().
+    """
+    name: str
+    count: int
+    items: list[ProfileItem]
@@ -0,0 +1,514 @@
+"""Sampler class that polls the runtime information of a controller from a
+background thread and keeps the most recent samples in a ring buffer.
+"""
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from instec.records import RuntimeInfo, Event
+from instec.constants import system_status, profile_status
+from instec.estimator import EtaEstimator
+
+
+class PollingPolicy:
+    """Chooses the sampling rate of a Sampler from the last sample, so that
+    controllers are polled quickly while the temperature is changing and
+    slowly while they are idle. The rate is fast during RAMP, RPP, PURGE,
+    PROFILE or a running profile, and while holding a temperature that has
+    not been reached yet. It is slow while stopped, paused or holding a
+    temperature that has been reached. Subclasses can override rate() to
+    use other rules.
+    """
+
+    def __init__(self, fast: float = 10, slow: float = 1,
+                 tolerance: float = 0.1, budget: float = None):
+        """Initialize the policy.
+
+        Args:
+            fast (float, optional):     Samples per second while the
+                                        temperature is changing.
+                                        Defaults to 10.
+            slow (float, optional):     Samples per second while idle.
+                                        Defaults to 1.
+            tolerance (float, optional):    Largest difference between PV
+                                            and TSP for a HOLD to be settled.
+                                            Defaults to 0.1.
+            budget (float, optional):   Most samples per second allowed for
+                                        each controller, which caps every
+                                        rate. Defaults to None (no cap).
+
+        Raises:
+            ValueError: If a rate or the budget is not positive.
+        """
+        for hz in (fast, slow) if budget is None else (fast, slow, budget):
+            Sampler._to_period(hz)
+        self.fast = fast
+        self.slow = slow
+        self.tolerance = tolerance
+        self.budget = budget
+
+    def rate(self, info: RuntimeInfo) -> float:
+        """Get the sampling rate to use after a sample.
+
+        Args:
+            info (RuntimeInfo): Last sample, or None if it failed.
+
+        Returns:
+            float: Samples per second, at most the budget.
+        """
+        if info is None:
+            hz = self.slow
+        elif (info.p_status == profile_status.RUN
+              or info.s_status in (system_status.RAMP, system_status.RPP,
+                                   system_status.PURGE,
+                                   system_status.PROFILE)):
+            hz = self.fast
+        elif info.s_status == system_status.HOLD:
+            settled = abs(info.pv - info.tsp) <= self.tolerance
+            hz = self.slow if settled else self.fast
+        else:
+            hz = self.slow
+        return hz if self.budget is None else min(hz, self.budget)
+
+
+class Deadband:
+    """Suppresses samples that do not differ enough from the last sample
+    that was emitted. A sample is emitted when a value moves beyond its
+    deadband, when the slave, system status, profile status, profile,
+    profile item or error code changes, or when heartbeat seconds have
+    passed since the last emitted sample. Samples of different sources
+    (such as controllers recorded to the same log) are compared separately.
+    """
+    DISCRETE = ('sx', 's_status', 'p_status', 'p', 'i', 'error_status')
+
+    def __init__(self, deadbands: dict = None, heartbeat: float = 60):
+        """Initialize the deadband.
+
+        Args:
+            deadbands (dict, optional): Smallest change of each value (pv,
+                                        mv, tsp, csp, rt, pp) that emits a
+                                        sample. Values that are not given
+                                        emit a sample on any change, and
+                                        values set to None are ignored.
+                                        Defaults to None.
+            heartbeat (float, optional):    Longest time between emitted
+                                            samples in seconds, or None to
+                                            only emit on changes.
+                                            Defaults to 60.
+
+        Raises:
+            ValueError: If an invalid field is given in deadbands.
+        """
+        deadbands = {} if deadbands is None else deadbands
+        for field in deadbands:
+            if (field not in RuntimeInfo._fields
+                    or field in Deadband.DISCRETE):
+                raise ValueError(f'Invalid field: {field}')
+        self._discrete = [RuntimeInfo._fields.index(field)
+                          for field in Deadband.DISCRETE]
+        self._deadbands = [
+            (index, deadbands.get(field, 0))
+            for index, field in enumerate(RuntimeInfo._fields)
+            if field not in Deadband.DISCRETE
+            and deadbands.get(field, 0) is not None]
+        self._heartbeat = heartbeat
+        self._emitted = {}
+        self._lock = threading.Lock()
+
+    def check(self, info: RuntimeInfo, timestamp: float, source: int = 0):
+        """Check whether a sample should be emitted, and if so, remember it
+        as the last emitted sample of its source.
+
+        Args:
+            info (RuntimeInfo): The sample.
+            timestamp (float):  time.time() of the sample.
+            source (int, optional): Source of the sample. Defaults to 0.
+
+        Returns:
+            bool: True if the sample should be emitted, False otherwise.
+        """
+        with self._lock:
+            if source in self._emitted and not self._changed(
+                    info, timestamp, *self._emitted[source]):
+                return False
+            self._emitted[source] = (timestamp, info)
+            return True
+
+    def _changed(self, info, timestamp, last_timestamp, last):
+        if (self._heartbeat is not None
+                and timestamp - last_timestamp >= self._heartbeat):
+            return True
+        for index in self._discrete:
+            if info[index] != last[index]:
+                return True
+        for index, deadband in self._deadbands:
+            if abs(info[index] - last[index]) > deadband:
+                return True
+        return False
+
+    def reset(self):
+        """Forget the last emitted samples, so the next sample of every
+        source is emitted.
+        """
+        with self._lock:
+            self._emitted.clear()
+
+
+class _events:
+    """Callbacks registered for each event, and the state needed to detect
+    the events from consecutive samples.
+    """
+    NAMES = ('system_status', 'profile_status', 'profile_item', 'error',
+             'enter_band', 'leave_band')
+
+    def __init__(self):
+        self._callbacks = {name: [] for name in _events.NAMES}
+        self._last = None
+        self._lock = threading.Lock()
+
+    def on(self, event: str, callback, band: float):
+        if event not in _events.NAMES:
+            raise ValueError(f'Invalid event: {event}')
+        if band < 0:
+            raise ValueError('Band must not be negative')
+        with self._lock:
+            # Whether PV is within the band is only known after a sample
+            self._callbacks[event].append([callback, band, None])
+
+    def off(self, event: str, callback):
+        if event not in _events.NAMES:
+            raise ValueError(f'Invalid event: {event}')
+        with self._lock:
+            self._callbacks[event] = [entry for entry in
+                                      self._callbacks[event]
+                                      if entry[0] != callback]
+
+    def reset(self):
+        with self._lock:
+            self._last = None
+            for event in ('enter_band', 'leave_band'):
+                for entry in self._callbacks[event]:
+                    entry[2] = None
+
+    def update(self, timestamp: float, info: RuntimeInfo):
+        """Detect the events between the previous sample and info, and
+        call their callbacks.
+
+        Returns:
+            list: Exceptions raised by callbacks.
+        """
+        with self._lock:
+            last, self._last = self._last, info
+            calls = []
+            if last is not None:
+                for name, old, new, changed in (
+                        ('system_status', last.s_status, info.s_status,
+                         last.s_status != info.s_status),
+                        ('profile_status', last.p_status, info.p_status,
+                         last.p_status != info.p_status),
+                        ('profile_item', last.i, info.i, last.i != info.i),
+                        ('error', last.error_status, info.error_status,
+                         info.error_status not in (0, None,
+                                                   last.error_status))):
+                    if changed:
+                        event = Event(name, timestamp, old, new, info)
+                        calls += [(entry[0], event)
+                                  for entry in self._callbacks[name]]
+            for name in ('enter_band', 'leave_band'):
+                for entry in self._callbacks[name]:
+                    callback, band, inside = entry
+                    entry[2] = abs(info.pv - info.tsp) <= band
+                    if inside is not None and entry[2] != inside and (
+                            entry[2] == (name == 'enter_band')):
+                        calls.append((callback, Event(
+                            name, timestamp, inside, entry[2], info)))
+
+        # Callbacks are called without the lock, so they can register or
+        # remove callbacks themselves
+        errors = []
+        for callback, event in calls:
+            try:
+                callback(event)
+            except Exception as error:
+                errors.append(error)
+        return errors
+
+
+class Sampler:
+    """Polls TEMP:RTIN? at a fixed rate from a daemon thread. Every sample
+    is stored with its timestamp (time.time()) in a fixed-size ring buffer
+    with one array('d') column per field, so memory use stays constant no
+    matter how long the sampler runs. Enums are stored as their value and
+    missing values as NaN. Any number of threads can read the buffer while
+    the sampler is running.
+    """
+    FIELDS = ('time',) + RuntimeInfo._fields
+
+    def __init__(self, command, hz: float = 10, capacity: int = 36000,
+                 policy: PollingPolicy = None, events: _events = None,
+                 estimator: EtaEstimator = None):
+        """Initialize the sampler. Sampling begins once start() is called.
+
+        Args:
+            command (command):      Connected MK2000B/MK2000VCP instance.
+            hz (float, optional):   Samples per second. Defaults to 10.
+            capacity (int, optional):   Number of samples kept in the buffer.
+                                        Defaults to 36000 (one hour at
+                                        10 Hz).
+            policy (PollingPolicy, optional):   Policy that chooses the rate
+                                                after each sample, in which
+                                                case hz is only used for the
+                                                first sample.
+                                                Defaults to None.
+            events (optional):  Callbacks registered with the on() function
+                                of the controller. Defaults to None (only
+                                callbacks registered with on() of the
+                                sampler).
+
+        Raises:
+            ValueError: If hz or capacity is not positive.
+        """
+        self._period = Sampler._to_period(hz)
+        self._policy = policy
+        self._events = _events() if events is None else events
+        self._events.reset()
+        self._estimator = (EtaEstimator() if estimator is None
+                           else estimator)
+        self._estimator.reset()
+        if capacity <= 0:
+            raise ValueError('Capacity must be positive')
+        self._command = command
+        self._capacity = int(capacity)
+        self._columns = {field: array('d', bytes(8 * self._capacity))
+                         for field in Sampler.FIELDS}
+        self._count = 0
+        self._latest = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __len__(self):
+        with self._lock:
+            return min(self._count, self._capacity)
+
+    def start(self):
+        """Start sampling from a daemon thread.
+
+        Raises:
+            RuntimeError: If the sampler is already running.
+        """
+        if self.is_running():
+            raise RuntimeError('Sampler is already running')
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the current sample to finish. The
+        buffered samples remain available.
+        """
+        self._stopped.set()
+        if (self._thread is not None
+                and self._thread is not threading.current_thread()):
+            self._thread.join()
+
+    @property
+    def hz(self) -> float:
+        """Current number of samples per second.
+        """
+        return 1 / self._period
+
+    def is_running(self):
+        """Check whether the sampler is running.
+
+        Returns:
+            bool: True if running, False otherwise.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                info = self._command.get_runtime_information()
+            except (RuntimeError, OSError) as error:
+                # Keep sampling, a single failed exchange is not fatal
+                self.error = error
+                info = None
+            else:
+                timestamp = time.time()
+                self._append(timestamp, info)
+                self._estimator.update(timestamp, info)
+                for error in self._events.update(timestamp, info):
+                    self.error = error
+
+            if self._policy is not None:
+                self._period = Sampler._to_period(self._policy.rate(info))
+            deadline = Sampler._next_deadline(deadline, self._period)
+            self._stopped.wait(deadline - time.monotonic())
+
+    def eta(self, confidence: float = 0.95):
+        """Get the expected time until PV reaches TSP, estimated from the
+        slope of recent samples. See EtaEstimator.estimate().
+
+        Args:
+            confidence (float, optional):   Confidence level of the interval.
+                                            Defaults to 0.95.
+
+        Returns:
+            EtaEstimate: Expected time with its confidence interval, or
+                         None if it cannot be estimated.
+        """
+        return self._estimator.estimate(confidence)
+
+    def on(self, event: str, callback, band: float = 1.0):
+        """Call a function whenever an event is detected between two
+        samples. See on() of the command set for the events.
+
+        Args:
+            event (str): Name of the event.
+            callback (function):    Function called with an Event from the
+                                    sampler thread.
+            band (float, optional): Largest difference between PV and TSP
+                                    that is within the band (enter_band and
+                                    leave_band only). Defaults to 1.0.
+
+        Raises:
+            ValueError: If an invalid event is given.
+        """
+        self._events.on(event, callback, band)
+
+    def off(self, event: str, callback):
+        """Stop calling a function registered with on().
+
+        Args:
+            event (str): Name of the event.
+            callback (function): Function registered with on().
+
+        Raises:
+            ValueError: If an invalid event is given.
+        """
+        self._events.off(event, callback)
+
+    def _to_period(hz: float):
+        if hz <= 0:
+            raise ValueError('Sample rate must be positive')
+        return 1 / hz
+
+    def _next_deadline(deadline: float, period: float):
+        # Deadlines are fixed multiples of the period from the first
+        # sample, so the sample rate does not drift. Deadlines that have
+        # already passed are skipped.
+        deadline += period
+        now = time.monotonic()
+        if deadline < now:
+            deadline += math.ceil((now - deadline) / period) * period
+        return deadline
+
+    def _sample_type(fields: tuple):
+        # Named tuple of the time and the given fields, and the index of
+        # each field in RuntimeInfo
+        for field in fields:
+            if field not in RuntimeInfo._fields:
+                raise ValueError(f'Invalid field: {field}')
+        return (namedtuple('Sample', ('time',) + tuple(fields)),
+                [RuntimeInfo._fields.index(field) for field in fields])
+
+    def _append(self, timestamp: float, info: RuntimeInfo):
+        with self._lock:
+            index = self._count % self._capacity
+            self._columns['time'][index] = timestamp
+            for field, value in zip(RuntimeInfo._fields, info):
+                self._columns[field][index] = Sampler._number(value)
+            self._count += 1
+            self._latest = (timestamp, info)
+
+    def _number(value):
+        if value is None:
+            return math.nan
+        return float(getattr(value, 'value', value))
+
+    def _ordered(self, fields):
+        # Copy the buffered samples of each field from oldest to newest.
+        # Must be called with the lock held.
+        if self._count <= self._capacity:
+            return {field: self._columns[field][:self._count]
+                    for field in fields}
+        start = self._count % self._capacity
+        return {field: (self._columns[field][start:]
+                        + self._columns[field][:start])
+                for field in fields}
+
+    def _fields(fields):
+        if fields is None:
+            return Sampler.FIELDS
+        for field in fields:
+            if field not in Sampler.FIELDS:
+                raise ValueError(f'Invalid field: {field}')
+        return ('time',) + tuple(f for f in fields if f != 'time')
+
+    def latest(self):
+        """Get the most recent sample.
+
+        Returns:
+            tuple: Tuple in the form (time, RuntimeInfo), or None if no
+                   sample has been taken yet.
+        """
+        with self._lock:
+            return self._latest
+
+    def window(self, seconds: float, fields: tuple = None):
+        """Get the samples taken in the last number of seconds.
+
+        Args:
+            seconds (float): Length of the window in seconds.
+            fields (tuple, optional):   Fields to return, see Sampler.FIELDS.
+                                        The time column is always included.
+                                        Defaults to all fields.
+
+        Raises:
+            ValueError: If an invalid field is given.
+
+        Returns:
+            dict: Dictionary that maps each field to an array('d') of its
+                  samples, from oldest to newest.
+        """
+        fields = Sampler._fields(fields)
+        cutoff = time.time() - seconds
+        with self._lock:
+            columns = self._ordered(fields)
+        start = bisect_left(columns['time'], cutoff)
+        return {field: column[start:] for field, column in columns.items()}
+
+    def to_numpy(self, fields: tuple = None):
+        """Get all buffered samples as NumPy arrays. Requires NumPy.
+
+        Args:
+            fields (tuple, optional):   Fields to return, see Sampler.FIELDS.
+                                        The time column is always included.
+                                        Defaults to all fields.
+
+        Raises:
+            ValueError: If an invalid field is given.
+
+        Returns:
+            dict: Dictionary that maps each field to a float64 array of its
+                  samples, from oldest to newest.
+        """
+        import numpy
+
+        fields = Sampler._fields(fields)
+        with self._lock:
+            columns = self._ordered(fields)
+        return {field: numpy.frombuffer(column, dtype=numpy.float64)
+                for field, column in columns.items()}
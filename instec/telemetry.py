@@ -0,0 +1,318 @@
+"""Recorder and reader classes for telemetry logs, binary files of runtime
+information samples stored as fixed-size float64 records.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from instec.records import RuntimeInfo
+from instec.sampler import Sampler, Deadband
+
+
+class _log_format:
+    """Layout of a telemetry log. The file starts with a header:
+
+        magic (8 bytes), version (uint32), column count (uint32),
+        header size (uint32), column names (UTF-8, comma separated)
+
+    padded with zeros to a multiple of 8 bytes. The header is followed by
+    the records, each being one float64 per column in native byte order.
+    """
+    MAGIC = b'INSTECTL'
+    VERSION = 1
+    PREFIX = struct.Struct('<8sIII')
+    COLUMNS = ('time', 'source') + RuntimeInfo._fields
+
+    def header(columns: tuple, magic: bytes = MAGIC):
+        names = ','.join(columns).encode()
+        size = _log_format.PREFIX.size + len(names)
+        size += -size % 8
+        return (_log_format.PREFIX.pack(magic, _log_format.VERSION,
+                                        len(columns), size)
+                + names.ljust(size - _log_format.PREFIX.size, b'\0'))
+
+    def read_header(file, magic: bytes = MAGIC):
+        """Read the header of an open telemetry log, or of another file
+        with the same header layout but a different magic.
+
+        Raises:
+            ValueError: If the file is not a telemetry log.
+
+        Returns:
+            tuple: Tuple in the form (columns, header size).
+        """
+        prefix = file.read(_log_format.PREFIX.size)
+        if len(prefix) != _log_format.PREFIX.size:
+            raise ValueError('Not a telemetry log')
+        file_magic, version, count, size = _log_format.PREFIX.unpack(prefix)
+        if file_magic != magic:
+            raise ValueError('Not a telemetry log')
+        if version != _log_format.VERSION:
+            raise ValueError(f'Unsupported telemetry log version: {version}')
+        names = file.read(size - _log_format.PREFIX.size).rstrip(b'\0')
+        columns = tuple(names.decode().split(','))
+        if len(columns) != count:
+            raise ValueError('Corrupted telemetry log header')
+        return columns, size
+
+
+class TelemetryRecorder:
+    """Appends runtime information samples from one or many controllers to
+    a telemetry log. Each record holds the time.time() of the sample, the
+    source (index of the controller that was sampled) and every RuntimeInfo
+    field, with enums stored as their value and missing values as NaN.
+    Records are written to disk as they are appended, so a TelemetryLog can
+    read the file while it is still being recorded.
+    """
+
+    def __init__(self, path: str, deadband: Deadband = None):
+        """Open a telemetry log for appending, creating it if it does not
+        exist. A partially written record at the end of an existing log is
+        discarded.
+
+        Args:
+            path (str): Path of the telemetry log.
+            deadband (Deadband, optional):  Deadband that suppresses samples
+                                            which did not change enough
+                                            since the last recorded sample
+                                            of the same source.
+                                            Defaults to None.
+
+        Raises:
+            ValueError: If the file exists but is not a compatible
+                        telemetry log.
+        """
+        self._path = path
+        self._record_size = 8 * len(_log_format.COLUMNS)
+        try:
+            with open(path, 'rb') as file:
+                columns, header_size = _log_format.read_header(file)
+        except FileNotFoundError:
+            with open(path, 'xb') as file:
+                file.write(_log_format.header(_log_format.COLUMNS))
+        else:
+            if columns != _log_format.COLUMNS:
+                raise ValueError('Incompatible telemetry log columns')
+            records = ((os.path.getsize(path) - header_size)
+                       // self._record_size)
+            os.truncate(path, header_size + records * self._record_size)
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()
+        self._deadband = deadband
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the telemetry log.
+        """
+        self._file.close()
+
+    def _record(self, timestamp: float, source: int, info: RuntimeInfo):
+        if self._deadband is not None and not self._deadband.check(
+                info, timestamp, source):
+            return ()
+        return (timestamp, source) + tuple(map(Sampler._number, info))
+
+    def append(self, info: RuntimeInfo, source: int = 0,
+               timestamp: float = None):
+        """Append a sample to the log.
+
+        Args:
+            info (RuntimeInfo): Runtime information of the controller.
+            source (int, optional): Index of the controller that was sampled.
+                                    Defaults to 0.
+            timestamp (float, optional):    time.time() of the sample.
+                                            Defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        self._write(array('d', self._record(timestamp, source, info)))
+
+    def extend(self, infos: list, timestamp: float = None):
+        """Append the samples of many controllers taken at the same time,
+        such as the result of ControllerPoller.get_runtime_information().
+        The source of each sample is its index in infos, and None entries
+        are skipped.
+
+        Args:
+            infos (list): Runtime information of each controller.
+            timestamp (float, optional):    time.time() of the samples.
+                                            Defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        records = array('d')
+        for source, info in enumerate(infos):
+            if info is not None:
+                records.extend(self._record(timestamp, source, info))
+        self._write(records)
+
+    def _write(self, records: array):
+        if not records:
+            return
+        with self._lock:
+            self._file.write(records)
+            self._file.flush()
+
+
+class TelemetryLog:
+    """Read-only view of a telemetry log. The file is memory-mapped, and
+    each column is returned as a strided memoryview of float64 values that
+    refers directly to the mapped file, so no data is copied. Call
+    refresh() to include records appended since the log was opened.
+
+    A sparse index holds the time of every INDEX_INTERVAL-th record, so
+    query() only touches the blocks of the file that overlap the requested
+    time range. Records are expected to be appended in time order.
+    """
+    INDEX_INTERVAL = 4096
+
+    def __init__(self, path: str):
+        """Open a telemetry log for reading.
+
+        Args:
+            path (str): Path of the telemetry log.
+
+        Raises:
+            ValueError: If the file is not a telemetry log.
+        """
+        self._file = open(path, 'rb')
+        try:
+            self._columns, self._header_size = _log_format.read_header(
+                self._file)
+        except ValueError:
+            self._file.close()
+            raise
+        self._map = None
+        self._records = memoryview(b'').cast('d')
+        self._index = array('d')
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._records) // len(self._columns)
+
+    @property
+    def columns(self) -> tuple:
+        """Names of the columns in the log.
+        """
+        return self._columns
+
+    def refresh(self):
+        """Map the log again, so that records appended since it was opened
+        or last refreshed are included. Columns returned before are not
+        changed.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        width = 8 * len(self._columns)
+        end = self._header_size + (size - self._header_size) // width * width
+        if end == self._header_size:
+            return
+        # Columns returned before keep the old map alive until they are
+        # released, so it is not closed here.
+        self._map = mmap.mmap(self._file.fileno(), end,
+                              access=mmap.ACCESS_READ)
+        self._records = memoryview(self._map)[self._header_size:].cast('d')
+
+        # Extend the index with the blocks that were appended
+        times = self.column('time')
+        self._index.extend(times[len(self._index) * self.INDEX_INTERVAL::
+                                 self.INDEX_INTERVAL])
+
+    def close(self):
+        """Close the log. The map is released once all columns returned by
+        column() are released as well.
+        """
+        self._records = memoryview(b'').cast('d')
+        self._index = array('d')
+        self._map = None
+        self._file.close()
+
+    def column(self, field: str) -> memoryview:
+        """Get every value of a column without copying it.
+
+        Args:
+            field (str): Name of the column, see columns.
+
+        Raises:
+            ValueError: If an invalid field is given.
+
+        Returns:
+            memoryview: Strided view of float64 values, one per record.
+        """
+        if field not in self._columns:
+            raise ValueError(f'Invalid field: {field}')
+        return self._records[self._columns.index(field)::len(self._columns)]
+
+    def query(self, start: float = None, end: float = None,
+              fields: tuple = None):
+        """Get the records within a time range without copying them. The
+        sparse index is searched first, followed by a binary search of the
+        time column within the matching blocks only.
+
+        Args:
+            start (float, optional):    Earliest time.time() included.
+                                        Defaults to the first record.
+            end (float, optional):      Latest time.time() included.
+                                        Defaults to the last record.
+            fields (tuple, optional):   Columns to return, see columns.
+                                        Defaults to all columns.
+
+        Raises:
+            ValueError: If an invalid field is given.
+
+        Returns:
+            dict: Dictionary that maps each field to a strided memoryview of
+                  its float64 values within the time range.
+        """
+        fields = self._columns if fields is None else fields
+        columns = {field: self.column(field) for field in fields}
+        first, last = self._range(start, end)
+        return {field: column[first:last]
+                for field, column in columns.items()}
+
+    def _range(self, start: float, end: float):
+        # Indices of the first record at or after start, and of the first
+        # record after end
+        times = self.column('time')
+        first = 0 if start is None else self._search(times, start,
+                                                     bisect_left)
+        last = len(times) if end is None else self._search(times, end,
+                                                           bisect_right)
+        return first, max(first, last)
+
+    def _search(self, times: memoryview, value: float, bisect):
+        block = bisect(self._index, value)
+        low = max(block - 1, 0) * self.INDEX_INTERVAL
+        high = min(block * self.INDEX_INTERVAL, len(times))
+        return bisect(times, value, low, high)
+
+    def to_numpy(self, fields: tuple = None):
+        """Get columns as NumPy arrays without copying them. Requires NumPy.
+
+        Args:
+            fields (tuple, optional):   Columns to return, see columns.
+                                        Defaults to all columns.
+
+        Raises:
+            ValueError: If an invalid field is given.
+
+        Returns:
+            dict: Dictionary that maps each field to a read-only float64
+                  array of its values.
+        """
+        import numpy
+
+        fields = self._columns if fields is None else fields
+        return {field: numpy.asarray(self.column(field)) for field in fields}
@@ -2,8 +2,8 @@
 """
 
 from abc import ABC, abstractmethod
-from instec.constants import (system_status, profile_status,
-                              temperature_mode, unit)
+from instec.constants import system_status, temperature_mode, unit
+from instec.records import RuntimeInfo
 
 
 class temperature(ABC):
@@ -24,9 +24,7 @@ class temperature(ABC):
         pass
 
     @abstractmethod
-    def get_runtime_information(self) -> tuple[int, float, float, float, float,
-                                               float, float, system_status,
-                                               profile_status, int, int, int]:
+    def get_runtime_information(self) -> RuntimeInfo:
         """Return runtime information, such as temperatures, execution
         statuses, and error codes. Refer to the SCPI manual for a more
         detailed description on return values. Here is a short description
@@ -51,16 +49,24 @@ class temperature(ABC):
         error_status (int): Error code status ID
 
         Returns:
-            (int, float, float, float, float, float, float, system_status,
-            profile_status, int, int, int): Tuple with information about the
-            controller at runtime.
+            RuntimeInfo: Named tuple (int, float, float, float, float, float,
+            float, system_status, profile_status, int, int, int) with
+            information about the controller at runtime.
         """
         pass
 
     @abstractmethod
-    def get_process_variables(self) -> tuple[float, ...]:
+    def get_process_variables(self, out=None) -> tuple[float, ...]:
         """Return process variable values for connected slaves.
 
+        Args:
+            out (optional): Preallocated buffer, such as an array('d') or
+                            NumPy array, that the values are written to
+                            instead of returning a tuple. Defaults to None.
+
+        Raises:
+            RuntimeError: If the response is malformed.
+
         Returns:
             (float tuple):  Process Variable (PV) – Current temperature of
                             all connected slaves
@@ -68,9 +74,17 @@ class temperature(ABC):
         pass
 
     @abstractmethod
-    def get_monitor_values(self) -> tuple[float, ...]:
+    def get_monitor_values(self, out=None) -> tuple[float, ...]:
         """Return monitor values for connected slaves.
 
+        Args:
+            out (optional): Preallocated buffer, such as an array('d') or
+                            NumPy array, that the values are written to
+                            instead of returning a tuple. Defaults to None.
+
+        Raises:
+            RuntimeError: If the response is malformed.
+
         Returns:
             (float tuple):  Monitor Value (MV) – Monitor temperature of all
                             connected slaves
@@ -78,9 +92,17 @@ class temperature(ABC):
         pass
 
     @abstractmethod
-    def get_protection_sensors(self) -> tuple[float, ...]:
+    def get_protection_sensors(self, out=None) -> tuple[float, ...]:
         """Return protection sensor values for connected slaves.
 
+        Args:
+            out (optional): Preallocated buffer, such as an array('d') or
+                            NumPy array, that the values are written to
+                            instead of returning a tuple. Defaults to None.
+
+        Raises:
+            RuntimeError: If the response is malformed.
+
         Returns:
             (float tuple): Protection sensor value of all connected slaves.
         """
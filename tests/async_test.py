@@ -0,0 +1,127 @@
+"""Asyncio command set test cases.
+See controller_test.py first before running this test.
+"""
+
+
+import asyncio
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from controller_test import controller_test
+from poller_test import fake_controller
+
+
+class async_test(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Called at the start of each test. Connects using the MODE,
+        BAUD, and PORT defined in controller_test.
+        """
+        self._controller = instec.AsyncMK2000B(controller_test.MODE,
+                                               controller_test.BAUD,
+                                               controller_test.PORT)
+        await self._controller.connect()
+        self.assertTrue(await self._controller.is_connected())
+
+    async def asyncTearDown(self):
+        """Called at the end of each test.
+        """
+        await self._controller.disconnect()
+        self.assertFalse(await self._controller.is_connected())
+
+    async def test_query(self):
+        """Test retrieving values with coroutines.
+        """
+
+        # Run several queries concurrently on the same connection
+        info, slave, pvs, pv = await asyncio.gather(
+            self._controller.get_system_information(),
+            self._controller.get_operating_slave(),
+            self._controller.get_process_variables(),
+            self._controller.get_process_variable())
+
+        # Check serial number
+        self.assertEqual(info[2],
+                         await self._controller.get_serial_number())
+
+        # Check process variable
+        # value may be slightly different due to command call delay
+        self.assertAlmostEqual(pvs[slave - 1], pv,
+                               None, 'Not close enough', 0.1)
+
+    async def test_hold_invalid(self):
+        """Test invalid HOLD values.
+        """
+
+        # Get operation range
+        max, min = await self._controller.get_operation_range()
+
+        # Set invalid hold
+        with self.assertRaises(ValueError):
+            await self._controller.hold_check(max + 1)
+
+        # Check if system status is STOP
+        self.assertEqual(await self._controller.get_system_status(),
+                         instec.system_status.STOP)
+
+    async def test_stream(self):
+        """Test streaming runtime information at a fixed rate.
+        """
+
+        # Collect samples from the stream
+        samples = []
+        async for sample in self._controller.stream(('pv', 's_status'),
+                                                    hz=10):
+            samples.append(sample)
+            if len(samples) == 5:
+                break
+
+        # Check fields and spacing of samples
+        self.assertEqual(samples[0]._fields, ('time', 'pv', 's_status'))
+        self.assertTrue(isinstance(samples[-1].s_status,
+                                   instec.system_status))
+        self.assertAlmostEqual(samples[-1].time - samples[0].time, 0.4,
+                               None, 'Not close enough', 0.1)
+
+
+class async_timeout_test(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Start the fake controller and connect to it.
+        """
+        self._device = fake_controller()
+        self._controller = instec.AsyncMK2000B(instec.mode.ETHERNET,
+                                               ip='127.0.0.1')
+        await self._controller.connect()
+
+    async def asyncTearDown(self):
+        """Disconnect and stop the fake controller.
+        """
+        await self._controller.disconnect()
+        self._device.close()
+
+    async def test_late_response(self):
+        """Test that a late response is not read by the next command.
+        """
+
+        # The first response arrives after the command timed out
+        self._device.replies = [(0.5, 25.0), (0, 30.0)]
+        timeout = instec.connection.TIMEOUT
+        instec.connection.TIMEOUT = 0.2
+        try:
+            with self.assertRaises(RuntimeError):
+                await self._controller.get_runtime_information()
+        finally:
+            instec.connection.TIMEOUT = timeout
+
+        # Check the next commands read their own response
+        rtin = await self._controller.get_runtime_information()
+        self.assertEqual(rtin.pv, 30.0)
+        self.assertEqual(await self._controller.get_serial_number(), 'SN123')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Batch query test cases.
+See controller_test.py first before running this test.
+"""
+
+
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from controller_test import controller_test
+from poller_test import fake_controller
+
+
+class batch_test(controller_test):
+    def test_batch_query(self):
+        """Test that batched queries match individual queries.
+        """
+
+        # Queue queries in a single batch
+        with self._controller.batch() as b:
+            slave = b.get_operating_slave()
+            count = b.get_slave_count()
+            pvs = b.get_process_variables()
+            pv = b.get_process_variable()
+            status = b.get_system_status()
+            info = b.get_system_information()
+
+        # Check static values
+        self.assertEqual(slave.result(),
+                         self._controller.get_operating_slave())
+        self.assertEqual(count.result(), self._controller.get_slave_count())
+        self.assertEqual(len(pvs.result()), count.result())
+        self.assertEqual(info.result(),
+                         self._controller.get_system_information())
+
+        # Check process variable
+        # value may be slightly different due to command call delay
+        self.assertAlmostEqual(
+            pv.result(), pvs.result()[slave.result() - 1],
+            None, 'Not close enough', 0.1)
+
+        # Check system status
+        self.assertEqual(status.result(),
+                         self._controller.get_system_status())
+
+    def test_batch_command(self):
+        """Test that commands without a response cannot be batched.
+        """
+
+        # Queue a command without response
+        with self._controller.batch() as b:
+            result = b.stop()
+
+        # Check that the future raised an exception
+        self.assertTrue(isinstance(result.exception(), ValueError))
+
+
+class batch_command_test(unittest.TestCase):
+    def setUp(self):
+        """Start the fake controller and connect to it.
+        """
+        self._device = fake_controller()
+        self._controller = instec.MK2000B(instec.mode.ETHERNET,
+                                          ip='127.0.0.1')
+        self._controller.connect()
+
+    def tearDown(self):
+        """Disconnect and stop the fake controller.
+        """
+        self._controller.disconnect()
+        self._device.close()
+
+    def test_batch_check(self):
+        """Test that commands which return a response are not sent by a
+        batch.
+        """
+
+        # Queue HOLD and RAMP commands together with a query
+        with self._controller.batch() as b:
+            hold = b.hold_check(30.0)
+            ramp = b.ramp_check(30.0, 10.0)
+            serial = b.get_serial_number()
+
+        # Check that the futures raised an exception
+        self.assertTrue(isinstance(hold.exception(), ValueError))
+        self.assertTrue(isinstance(ramp.exception(), ValueError))
+
+        # Check that the query was still answered
+        self.assertEqual(serial.result(), 'SN123')
+
+        # Check that the commands were never sent
+        for line in self._device.received:
+            self.assertNotIn('HOLD', line)
+            self.assertNotIn('RAMP', line)
+
+
+if __name__ == '__main__':
+    unittest.main()
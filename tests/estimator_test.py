@@ -0,0 +1,134 @@
+"""Estimator test cases that use generated runtime information, so no
+controller needs to be connected.
+"""
+
+
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from instec.estimator import _settle_tracker
+
+
+# Runtime information used instead of samples from a controller
+INFO = instec.RuntimeInfo(1, 0.0, 0.0, 10.0, 0.0, 30.0, 0.5,
+                          instec.system_status.RAMP,
+                          instec.profile_status.STOP, 0, 0, 0)
+
+
+class eta_test(unittest.TestCase):
+    def test_estimate(self):
+        """Test estimating the time until PV reaches TSP.
+        """
+
+        # Feed the estimator a ramp of 0.5 degrees per second
+        estimator = instec.EtaEstimator(window=10)
+        for step in range(11):
+            estimator.update(step, INFO._replace(pv=step * 0.5))
+        eta = estimator.estimate()
+        self.assertAlmostEqual(eta.seconds, 10)
+        self.assertAlmostEqual(eta.slope, 0.5)
+        self.assertLessEqual(eta.low, eta.seconds)
+        self.assertGreaterEqual(eta.high, eta.seconds)
+
+        # Check that a lower confidence gives a narrower interval
+        narrow = estimator.estimate(0.5)
+        self.assertGreaterEqual(narrow.low, eta.low)
+        self.assertLessEqual(narrow.high, eta.high)
+
+        # Check invalid confidence
+        with self.assertRaises(ValueError):
+            estimator.estimate(1)
+
+    def test_no_estimate(self):
+        """Test that there is no estimate when PV cannot reach TSP.
+        """
+
+        # Check that PV moving away has no estimate
+        estimator = instec.EtaEstimator(window=10)
+        for step in range(11):
+            estimator.update(step, INFO._replace(pv=-step * 0.5))
+        self.assertIsNone(estimator.estimate())
+
+        # Check that STOP has no estimate
+        estimator.update(11, INFO._replace(
+            s_status=instec.system_status.STOP))
+        self.assertIsNone(estimator.estimate())
+
+        # Check that a new TSP starts the fit over
+        estimator.update(12, INFO._replace(pv=0.0, tsp=20.0))
+        self.assertIsNone(estimator.estimate())
+
+
+class settle_tracker_test(unittest.TestCase):
+    # Runtime information of a HOLD far below TSP
+    HOLD = INFO._replace(pv=25.0, tsp=75.0,
+                         s_status=instec.system_status.HOLD)
+
+    def _track(self, pvs: list, interval: float = 0.25):
+        """Check the tracker once per second with each PV in pvs, and
+        return the delay after the last check.
+        """
+        tracker = _settle_tracker(None, 0.1, 0, 0)
+        for now, pv in enumerate(pvs):
+            self.assertIsNone(tracker.update(self.HOLD._replace(pv=pv),
+                                             now, interval))
+        return tracker.delay
+
+    def test_noise(self):
+        """Test that noise far from TSP is not taken for progress.
+        """
+
+        # A single noise step would predict a wait of many minutes
+        self.assertEqual(self._track([25.0, 25.0, 25.01]), 0.25)
+        self.assertEqual(self._track([25.0, 25.01, 25.0, 25.01, 25.0]),
+                         0.25)
+
+    def test_moving_away(self):
+        """Test that PV moving away from TSP is not taken for progress.
+        """
+
+        self.assertEqual(self._track([25.0, 24.5, 24.0, 23.5]), 0.25)
+
+    def test_approach(self):
+        """Test that the delay follows the rate PV approaches TSP at, and
+        is capped.
+        """
+
+        # 1 degree per second with 1.8 degrees left to the band predicts
+        # 1.8 seconds, half of which is slept
+        self.assertAlmostEqual(self._track([70.1, 71.1, 72.1, 73.1]), 0.9)
+
+        # 50 degrees left is capped
+        self.assertEqual(self._track([22.0, 23.0, 24.0, 25.0]),
+                         _settle_tracker.MAX_DELAY)
+
+        # The ramp rate is used while ramping
+        tracker = _settle_tracker(None, 0.1, 0, 0)
+        tracker.update(self.HOLD._replace(
+            pv=74.0, rt=30.0, s_status=instec.system_status.RAMP), 0, 0.25)
+        self.assertAlmostEqual(tracker.delay, 0.5 * 0.9 / 30 * 60)
+
+    def test_settled(self):
+        """Test the statistics once PV settles.
+        """
+
+        tracker = _settle_tracker(None, 0.1, 1, 0)
+        self.assertIsNone(tracker.update(self.HOLD, 0, 0.25))
+        self.assertIsNone(tracker.update(self.HOLD._replace(pv=75.05), 1,
+                                         0.25))
+        stats = tracker.update(self.HOLD._replace(pv=74.98), 2, 0.25)
+        self.assertEqual(stats.elapsed, 2)
+        self.assertEqual(stats.time_to_band, 1)
+        self.assertAlmostEqual(stats.overshoot, 0.05)
+        self.assertAlmostEqual(stats.max_deviation, 0.05)
+        self.assertEqual(stats.pv, 74.98)
+        self.assertEqual(stats.samples, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Parser test cases that use raw responses, so no controller needs to be
+connected.
+"""
+
+
+from array import array
+from ast import literal_eval
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from instec.parsers import parse
+
+
+class values_test(unittest.TestCase):
+    def test_values(self):
+        """Test parsing the values of 1 to 4 slaves.
+        """
+
+        for count in range(1, 5):
+            raw = ','.join(f'{25.5 + slave:.3f}' for slave in range(count))
+
+            # Check the result matches the previous literal_eval parsing
+            self.assertEqual(parse.values(raw), literal_eval(f'({raw},)'))
+            self.assertEqual(len(parse.values(raw)), count)
+
+        # Check signs and exponents
+        self.assertEqual(parse.values('-12.5,+3,.5,1e2'),
+                         (-12.5, 3.0, 0.5, 100.0))
+
+    def test_whitespace(self):
+        """Test that whitespace and the line terminator are ignored.
+        """
+
+        self.assertEqual(parse.values('25.000,-40.000\r\n'), (25.0, -40.0))
+        self.assertEqual(parse.values(' 25.000 , -40.000 '), (25.0, -40.0))
+
+    def test_malformed(self):
+        """Test that malformed responses raise a clear error.
+        """
+
+        for raw in ['', '\r\n', '1,,2', 'abc', '1,2,', '1;2']:
+            with self.assertRaises(RuntimeError) as context:
+                parse.values(raw)
+            self.assertIn(repr(raw), str(context.exception))
+
+    def test_out(self):
+        """Test writing values into a preallocated buffer.
+        """
+
+        # Check that the buffer itself is returned
+        buffer = array('d', [0.0] * 3)
+        self.assertIs(parse.values('1.5,2.5', buffer), buffer)
+        self.assertEqual(list(buffer), [1.5, 2.5, 0.0])
+
+        # Check that a buffer which is too small is not written to
+        buffer = array('d', [0.0])
+        with self.assertRaises(ValueError):
+            parse.values('1.5,2.5', buffer)
+        self.assertEqual(list(buffer), [0.0])
+
+
+class runtime_information_test(unittest.TestCase):
+    def test_runtime_information(self):
+        """Test parsing the runtime information of an MK2000B.
+        """
+
+        rtin = parse.runtime_information(
+            'MK2000B:2:25.000:24.000:30.000:26.000:10.000:0.5:2:'
+            '1,4,7:0\r\n')
+        self.assertEqual(rtin, instec.RuntimeInfo(
+            2, 25.0, 24.0, 30.0, 26.0, 10.0, 0.5,
+            instec.system_status.RAMP, instec.profile_status.RUN,
+            4, 7, 0))
+
+    def test_vcp(self):
+        """Test parsing the runtime information of an MK2000VCP, which has
+        different status codes and no error status.
+        """
+
+        rtin = parse.runtime_information(
+            'MK2000VCP:1:25.000:24.000:30.000:26.000:10.000:0.5:21:'
+            '0,0,0\r\n', parse.VCP_SYSTEM_STATUS, False)
+        self.assertEqual(rtin.s_status, instec.system_status.RPP)
+        self.assertEqual(rtin.error_status, -1)
+
+        # Check the other VCP specific status code
+        rtin = parse.runtime_information(
+            'MK2000VCP:1:25.000:24.000:30.000:26.000:10.000:0.5:5:'
+            '0,0,0\r\n', parse.VCP_SYSTEM_STATUS, False)
+        self.assertEqual(rtin.s_status, instec.system_status.STOP)
+
+    def test_malformed(self):
+        """Test that malformed runtime information raises a clear error.
+        """
+
+        for raw in ['', 'abc', 'MK2000B:1:25.000',
+                    'MK2000B:1:x:24.000:30.000:26.000:10.000:0.5:3:'
+                    '0,0,0:0',
+                    'MK2000B:1:25.000:24.000:30.000:26.000:10.000:0.5:99:'
+                    '0,0,0:0']:
+            with self.assertRaises(RuntimeError) as context:
+                parse.runtime_information(raw)
+            self.assertIn(repr(raw), str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
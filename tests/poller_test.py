@@ -0,0 +1,140 @@
+"""Poller test cases that run against a fake controller on the local
+machine, so no controller needs to be connected.
+"""
+
+
+import socket
+import threading
+import time
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+
+
+class fake_controller:
+    """Answers TEMP:RTIN?, TEMP:SNUM? and the range queries over TCP like
+    an MK2000B, with an optional delay before each runtime information
+    response. Replies in the form (delay, pv) are used for the next
+    responses, before falling back on delay and a PV of 25. Every line
+    received is kept in received.
+    """
+    RTIN = 'MK2000B:1:{:.3f}:24.000:30.000:26.000:10.000:0.5:1:0,0,0:0'
+    ANSWERS = {'TEMP:SNUM?': 'SN123',
+               'TEMP:RANG?': '200.000,-40.000',
+               'TEMP:RTR?': '150.000,0.100,100.000,20.000,0.100'}
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.replies = []
+        self.received = []
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 50292))
+        self._server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self._server.close()
+
+    def _accept(self):
+        try:
+            conn, _ = self._server.accept()
+        except OSError:
+            return
+        with conn:
+            data = b''
+            while True:
+                received = conn.recv(1024)
+                if not received:
+                    return
+                data += received
+                while b'\n' in data:
+                    line, data = data.split(b'\n', 1)
+                    line = line.decode().strip()
+                    self.received.append(line)
+                    answers = [self._answer(query.strip().lstrip(':'))
+                               for query in line.split(';')]
+                    answers = [a for a in answers if a is not None]
+                    if answers:
+                        conn.sendall((';'.join(answers) + '\r\n').encode())
+
+    def _answer(self, query: str):
+        if query == 'TEMP:RTIN?':
+            delay, pv = (self.replies.pop(0) if self.replies
+                         else (self.delay, 25.0))
+            time.sleep(delay)
+            return self.RTIN.format(pv)
+        return self.ANSWERS.get(query)
+
+
+class poller_test(unittest.TestCase):
+    def setUp(self):
+        """Start the fake controller and connect to it.
+        """
+        self._device = fake_controller()
+        self._controller = instec.MK2000B(instec.mode.ETHERNET,
+                                          ip='127.0.0.1')
+        self._controller.connect()
+
+    def tearDown(self):
+        """Disconnect and stop the fake controller.
+        """
+        self._controller.disconnect()
+        self._device.close()
+
+    def test_poll(self):
+        """Test polling a controller that responds in time.
+        """
+
+        # Poll the controller
+        with instec.ControllerPoller([self._controller]) as poller:
+            rtin = poller.get_runtime_information()
+
+        # Check the result matches a direct query
+        self.assertEqual(rtin, [self._controller.get_runtime_information()])
+
+    def test_poll_timeout(self):
+        """Test that a late response is not read by the next command.
+        """
+
+        # Poll with a timeout shorter than the response delay
+        self._device.delay = 0.3
+        with instec.ControllerPoller([self._controller]) as poller:
+            self.assertEqual(poller.get_runtime_information(timeout=0.1),
+                             [None])
+
+            # Check the next command reads its own response
+            self.assertEqual(self._controller.get_serial_number(), 'SN123')
+
+            # Check the next poll reads its own response
+            rtin = poller.get_runtime_information(timeout=1)
+            self.assertEqual(rtin[0].pv, 25.0)
+
+    def test_wait_all_settled_timeout(self):
+        """Test that a late response is not read as the next check of
+        wait_all_settled().
+        """
+
+        # The first response arrives after the poll timed out, the second
+        # one is within tolerance of TSP
+        self._device.replies = [(0.5, 25.0), (0, 30.0)]
+        timeout = instec.connection.TIMEOUT
+        instec.connection.TIMEOUT = 0.2
+        try:
+            stats = instec.wait_all_settled([self._controller], 0.1, 5,
+                                            [30.0])
+        finally:
+            instec.connection.TIMEOUT = timeout
+
+        # Check that the second response settled the controller
+        self.assertEqual(stats[0].pv, 30.0)
+        self.assertEqual(stats[0].samples, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -213,6 +213,20 @@ class profile_test(controller_test):
             p2 = b2.get(i)
             self.assertEqual(item[2], p2)
 
+        # Check reading the whole profile at once
+        profile = self._controller.read_profile(self.TEST_PROFILE)
+        self.assertTrue(isinstance(profile, instec.Profile))
+        self.assertEqual(profile.name, self._controller.get_profile_name(
+            self.TEST_PROFILE))
+        self.assertEqual(profile.count, len(items))
+        self.assertEqual(profile.items, [
+            self._controller.get_profile_item(self.TEST_PROFILE, i)
+            for i in range(len(items))])
+
+        # Check invalid profile
+        with self.assertRaises(ValueError):
+            self._controller.read_profile(-1)
+
         # Test setting items by replacing every item with STOP
         for i in range(len(items)):
             # Set profile item at index i to STOP
@@ -0,0 +1,288 @@
+"""Background sampler test cases. Only sampler_test needs a controller,
+see controller_test.py first before running it.
+"""
+
+
+import time
+import unittest
+import sys
+import os
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from instec.sampler import _events
+from controller_test import controller_test
+
+
+class sampler_test(controller_test):
+    def test_sampling(self):
+        """Test that the sampler fills its ring buffer.
+        """
+
+        # Sample for a short time with a small buffer
+        sampler = self._controller.start_sampling(hz=20, capacity=10)
+        time.sleep(1)
+
+        # Check that the buffer is full but not larger than its capacity
+        self.assertTrue(sampler.is_running())
+        self.assertEqual(len(sampler), 10)
+
+        # Check latest sample
+        timestamp, info = sampler.latest()
+        self.assertTrue(isinstance(info, instec.RuntimeInfo))
+        self.assertAlmostEqual(timestamp, time.time(), None,
+                               'Not close enough', 0.5)
+
+        # Check that the window is in order and only contains recent samples
+        window = sampler.window(0.2, ('pv', 'tsp'))
+        self.assertEqual(set(window), {'time', 'pv', 'tsp'})
+        self.assertTrue(1 <= len(window['time']) <= 5)
+        self.assertEqual(list(window['time']), sorted(window['time']))
+        self.assertEqual(len(window['pv']), len(window['time']))
+
+        # Check that stopping the sampler keeps the buffer
+        self._controller.stop_sampling()
+        self.assertFalse(sampler.is_running())
+        self.assertEqual(len(sampler), 10)
+
+        # Check invalid parameters
+        with self.assertRaises(ValueError):
+            sampler.window(1, ('invalid',))
+        with self.assertRaises(ValueError):
+            self._controller.start_sampling(hz=0)
+
+    def test_policy(self):
+        """Test adapting the sampling rate to the system status.
+        """
+
+        # Stop the controller, so the policy should choose the slow rate
+        self._controller.stop()
+        time.sleep(self.UPDATE_DELAY)
+        policy = instec.PollingPolicy(fast=20, slow=2, budget=10)
+        sampler = self._controller.start_sampling(hz=20, policy=policy)
+        time.sleep(1)
+        self.assertEqual(sampler.hz, 2)
+        self.assertTrue(2 <= len(sampler) <= 4)
+
+        # Check that the budget caps the fast rate
+        info = sampler.latest()[1]._replace(
+            s_status=instec.system_status.RAMP)
+        self.assertEqual(policy.rate(info), 10)
+
+        # Check that a settled HOLD uses the slow rate
+        info = info._replace(s_status=instec.system_status.HOLD,
+                             tsp=info.pv + policy.tolerance / 2)
+        self.assertEqual(policy.rate(info), 2)
+        info = info._replace(tsp=info.pv + 1)
+        self.assertEqual(policy.rate(info), 10)
+
+        self._controller.stop_sampling()
+
+    def test_events(self):
+        """Test callbacks of status transitions.
+        """
+
+        # Register callbacks before sampling
+        events = []
+        self._controller.on('system_status', events.append)
+        self._controller.on('enter_band', events.append, band=1000)
+        with self.assertRaises(ValueError):
+            self._controller.on('invalid', events.append)
+
+        # Change the system status while sampling
+        self._controller.stop()
+        self._controller.start_sampling(hz=20)
+        time.sleep(self.UPDATE_DELAY)
+        max, min = self._reset_operation_range()
+        self._controller.hold((max + min) / 2)
+        time.sleep(self.UPDATE_DELAY)
+        self._controller.stop()
+        time.sleep(self.UPDATE_DELAY)
+        self._controller.stop_sampling()
+
+        # Check the transitions from STOP to HOLD and back
+        transitions = [(event.old, event.new) for event in events
+                       if event.name == 'system_status']
+        self.assertEqual(transitions[0], (instec.system_status.STOP,
+                                          instec.system_status.HOLD))
+        self.assertEqual(transitions[-1], (instec.system_status.HOLD,
+                                           instec.system_status.STOP))
+        self.assertTrue(isinstance(events[0], instec.Event))
+
+        # PV is always within a wide band, so it never enters it
+        self.assertFalse([e for e in events if e.name == 'enter_band'])
+
+        self._controller.off('system_status', events.append)
+
+    def test_eta(self):
+        """Test estimating the time until PV reaches TSP.
+        """
+
+        # Check that eta() requires sampling
+        with self.assertRaises(RuntimeError):
+            self._controller.eta()
+
+        # Hold above the current PV while sampling
+        max, min = self._reset_operation_range()
+        pv = self._controller.get_process_variable()
+        tsp = pv + 5 if pv + 5 <= max else pv - 5
+        self._controller.hold(tsp)
+        self._controller.start_sampling(hz=10)
+        time.sleep(self.UPDATE_DELAY + 2)
+
+        # Check the estimate while approaching TSP
+        eta = self._controller.eta()
+        self.assertIsNotNone(eta)
+        self.assertLessEqual(eta.low, eta.seconds)
+        self.assertGreaterEqual(eta.high, eta.seconds)
+
+        self._controller.stop_sampling()
+        self._controller.stop()
+
+    def test_stream(self):
+        """Test streaming runtime information at a fixed rate.
+        """
+
+        # Collect samples from the stream
+        samples = []
+        for sample in self._controller.stream(('pv', 'tsp'), hz=10):
+            samples.append(sample)
+            if len(samples) == 5:
+                break
+
+        # Check fields and spacing of samples
+        self.assertEqual(samples[0]._fields, ('time', 'pv', 'tsp'))
+        self.assertAlmostEqual(samples[-1].time - samples[0].time, 0.4,
+                               None, 'Not close enough', 0.1)
+
+        # Check invalid fields
+        with self.assertRaises(ValueError):
+            self._controller.stream(('invalid',))
+
+    def test_stream_deadband(self):
+        """Test suppressing stream samples that did not change enough.
+        """
+
+        # Check that a stream without changes only emits heartbeats
+        stream = self._controller.stream(
+            hz=20, deadband=instec.Deadband({'pv': 1000, 'mv': 1000,
+                                             'csp': 1000, 'pp': 1000},
+                                            heartbeat=0.5))
+        first = next(stream)
+        second = next(stream)
+        self.assertAlmostEqual(second.time - first.time, 0.5, None,
+                               'Not close enough', 0.1)
+
+
+class deadband_test(unittest.TestCase):
+    def test_deadband(self):
+        """Test suppressing samples that did not change enough.
+        """
+
+        info = instec.RuntimeInfo(1, 25.0, 24.0, 30.0, 26.0, 10.0, 0.5,
+                                  instec.system_status.HOLD,
+                                  instec.profile_status.STOP, 0, 0, 0)
+        deadband = instec.Deadband({'pv': 0.5, 'pp': None}, heartbeat=10)
+
+        # First sample is always emitted, identical samples are not
+        self.assertTrue(deadband.check(info, 0))
+        self.assertFalse(deadband.check(info, 1))
+
+        # Check deadband of PV and ignored PP
+        self.assertFalse(deadband.check(info._replace(pv=info.pv + 0.4), 2))
+        self.assertFalse(deadband.check(info._replace(pp=info.pp + 50), 3))
+        self.assertTrue(deadband.check(info._replace(pv=info.pv + 0.6), 4))
+
+        # Check status changes, other sources and heartbeat
+        self.assertTrue(deadband.check(
+            info._replace(pv=info.pv + 0.6, i=info.i + 1), 5))
+        self.assertTrue(deadband.check(info, 6, source=1))
+        self.assertTrue(deadband.check(info, 16, source=1))
+
+        # Check that reset emits the next sample again
+        deadband.reset()
+        self.assertTrue(deadband.check(info, 17, source=1))
+
+        # Check invalid fields
+        with self.assertRaises(ValueError):
+            instec.Deadband({'s_status': 1})
+
+
+class events_test(unittest.TestCase):
+    def test_events(self):
+        """Test the events detected from consecutive samples.
+        """
+
+        info = instec.RuntimeInfo(1, 25.0, 24.0, 30.0, 26.0, 10.0, 0.5,
+                                  instec.system_status.STOP,
+                                  instec.profile_status.STOP, 0, 0, 0)
+        events = []
+        detector = _events()
+        for name in _events.NAMES:
+            detector.on(name, events.append, 1)
+
+        # Feed samples that change one field after another
+        samples = [
+            info,
+            info._replace(s_status=instec.system_status.HOLD),
+            info._replace(s_status=instec.system_status.HOLD, pv=29.5),
+            info._replace(s_status=instec.system_status.HOLD, pv=29.5,
+                          error_status=4),
+            info._replace(s_status=instec.system_status.PROFILE, pv=29.5,
+                          p_status=instec.profile_status.RUN, i=1,
+                          error_status=4),
+            info._replace(s_status=instec.system_status.PROFILE, pv=29.5,
+                          p_status=instec.profile_status.RUN, i=1,
+                          error_status=5),
+            info._replace(s_status=instec.system_status.PROFILE,
+                          p_status=instec.profile_status.RUN, i=1)]
+        for timestamp, sample in enumerate(samples):
+            self.assertEqual(detector.update(timestamp, sample), [])
+
+        # Check the exact events, an error is only reported when it changes
+        # to a non-zero value
+        self.assertEqual(
+            [(e.name, e.time, e.old, e.new) for e in events],
+            [('system_status', 1, instec.system_status.STOP,
+              instec.system_status.HOLD),
+             ('enter_band', 2, False, True),
+             ('error', 3, 0, 4),
+             ('system_status', 4, instec.system_status.HOLD,
+              instec.system_status.PROFILE),
+             ('profile_status', 4, instec.profile_status.STOP,
+              instec.profile_status.RUN),
+             ('profile_item', 4, 0, 1),
+             ('error', 5, 4, 5),
+             ('leave_band', 6, True, False)])
+        self.assertEqual([e.info for e in events],
+                         [samples[e.time] for e in events])
+
+        # Check that the first sample after reset has no events
+        events.clear()
+        detector.reset()
+        detector.update(7, info._replace(pv=29.5))
+        self.assertEqual(events, [])
+
+        # Check that removed callbacks are not called, and that exceptions
+        # raised by callbacks are returned
+        detector.off('system_status', events.append)
+        error = RuntimeError('callback')
+
+        def fail(event):
+            raise error
+        detector.on('profile_item', fail, 0)
+        self.assertEqual(detector.update(8, info._replace(i=2)), [error])
+        self.assertEqual([e.name for e in events], ['profile_item',
+                                                    'leave_band'])
+
+        # Check invalid events and bands
+        with self.assertRaises(ValueError):
+            detector.on('invalid', events.append, 1)
+        with self.assertRaises(ValueError):
+            detector.on('enter_band', events.append, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
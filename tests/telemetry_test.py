@@ -0,0 +1,167 @@
+"""Telemetry log test cases. Only telemetry_controller_test needs a
+controller, see controller_test.py first before running it.
+"""
+
+
+import os
+import tempfile
+import unittest
+import sys
+
+# Run tests using local copy of library - comment this out if unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instec
+from controller_test import controller_test
+
+
+# Runtime information used instead of samples from a controller
+INFO = instec.RuntimeInfo(1, 25.0, 24.0, 30.0, 26.0, 10.0, 0.5,
+                          instec.system_status.HOLD,
+                          instec.profile_status.STOP, 0, 0, 0)
+
+
+class telemetry_test(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, 'test.tlog')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_record(self):
+        """Test recording and reading runtime information.
+        """
+
+        with instec.TelemetryRecorder(self._path) as recorder:
+            # Open the log before anything is recorded
+            with instec.TelemetryLog(self._path) as log:
+                self.assertEqual(len(log), 0)
+
+                # Record samples
+                infos = [INFO._replace(pv=INFO.pv + i) for i in range(3)]
+                for info in infos:
+                    recorder.append(info)
+                recorder.extend([infos[-1], None, infos[-1]])
+
+                # Check that new records are read after refreshing
+                log.refresh()
+                self.assertEqual(len(log), 5)
+                self.assertEqual(list(log.column('source')),
+                                 [0, 0, 0, 0, 2])
+                self.assertEqual(list(log.column('pv')[:3]),
+                                 [info.pv for info in infos])
+                self.assertEqual(log.column('s_status')[0],
+                                 infos[0].s_status.value)
+
+                # Check invalid fields
+                with self.assertRaises(ValueError):
+                    log.column('invalid')
+
+        # Check that the log can be appended to after reopening
+        with instec.TelemetryRecorder(self._path) as recorder:
+            recorder.append(infos[0], 1)
+        with instec.TelemetryLog(self._path) as log:
+            self.assertEqual(len(log), 6)
+            self.assertEqual(log.column('source')[-1], 1)
+
+    def test_deadband(self):
+        """Test recording only samples that changed.
+        """
+
+        # Record identical samples of two sources, then a changed one
+        with instec.TelemetryRecorder(
+                self._path, instec.Deadband(heartbeat=None)) as recorder:
+            for timestamp in range(5):
+                recorder.extend([INFO, INFO], timestamp)
+            recorder.append(INFO._replace(pv=INFO.pv + 1), 1, 5)
+
+        # Check that only the first and changed samples were recorded
+        with instec.TelemetryLog(self._path) as log:
+            self.assertEqual(list(log.column('source')), [0, 1, 1])
+            self.assertEqual(list(log.column('time')), [0, 0, 5])
+
+    def test_query(self):
+        """Test querying records within a time range.
+        """
+
+        # Record samples with known timestamps
+        with instec.TelemetryRecorder(self._path) as recorder:
+            for timestamp in range(10000):
+                recorder.append(INFO, timestamp % 3, timestamp)
+
+        with instec.TelemetryLog(self._path) as log:
+            # Check a range that spans several index blocks
+            result = log.query(4000, 8999.5, ('time', 'source'))
+            self.assertEqual(set(result), {'time', 'source'})
+            self.assertEqual(list(result['time']),
+                             list(range(4000, 9000)))
+            self.assertEqual(result['source'][0], 4000 % 3)
+
+            # Check open and empty ranges
+            self.assertEqual(len(log.query(end=99)['pv']), 100)
+            self.assertEqual(len(log.query(start=9990)['pv']), 10)
+            self.assertEqual(len(log.query(20000, 30000)['pv']), 0)
+            self.assertEqual(len(log.query(5, 4)['pv']), 0)
+
+    def test_archive(self):
+        """Test compressing a telemetry log into an archive.
+        """
+
+        # Record noisy samples at irregular times
+        with instec.TelemetryRecorder(self._path) as recorder:
+            for i in range(20):
+                recorder.append(INFO._replace(pv=INFO.pv + (i % 7) * 0.013,
+                                              mv=INFO.mv - i * 0.0004),
+                                timestamp=1e9 + i * 0.1 + (i % 3) * 1e-3)
+
+        # Compress the log, rounding PV and MV to 3 decimal places
+        path = os.path.join(self._directory.name, 'test.tga')
+        device = instec.DeviceInfo('Instec', 'MK2000B', 'SN', '1.0', 1,
+                                   (3, 3), None, None, None, None)
+        precision = instec.ArchiveWriter.device_precision(device)
+        with instec.TelemetryLog(self._path) as log:
+            records = list(zip(*(log.column(c) for c in log.columns)))
+            with instec.ArchiveWriter(path, log.columns, precision,
+                                      block_size=8) as archive:
+                archive.extend(records)
+            self.assertLess(os.path.getsize(path),
+                            os.path.getsize(self._path))
+
+        # Check that the archive decodes to the rounded records
+        archived = list(instec.ArchiveReader(path))
+        self.assertEqual(len(archived), len(records))
+        for original, decoded in zip(records, archived):
+            rounded = tuple(
+                round(value, precision[column]) if column in precision
+                else value
+                for column, value in zip(log.columns[1:], original[1:]))
+            self.assertAlmostEqual(original[0], decoded[0], 5)
+            self.assertEqual(rounded, decoded[1:])
+
+
+class telemetry_controller_test(controller_test):
+    def test_record(self):
+        """Test recording runtime information from the controller.
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.tlog')
+
+            # Record samples from the controller
+            with instec.TelemetryRecorder(path) as recorder:
+                infos = []
+                for _ in range(3):
+                    infos.append(self._controller.get_runtime_information())
+                    recorder.append(infos[-1])
+
+            # Check the recorded values
+            with instec.TelemetryLog(path) as log:
+                self.assertEqual(list(log.column('pv')),
+                                 [info.pv for info in infos])
+                self.assertEqual(list(log.column('tsp')),
+                                 [info.tsp for info in infos])
+
+
+if __name__ == '__main__':
+    unittest.main()
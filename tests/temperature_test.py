@@ -4,6 +4,7 @@ See controller_test.py first before running this test.
 
 
 import time
+from array import array
 import unittest
 import sys
 import os
@@ -107,6 +108,11 @@ class info_query_test(controller_test):
             # Check error status
             self.assertEqual(data[11], self._controller.get_error())
 
+            # Check named fields
+            self.assertTrue(isinstance(data, instec.RuntimeInfo))
+            self.assertEqual(data.tsp, data[3])
+            self.assertEqual(data.s_status, data[7])
+
             # Delay so rtin gets updated info
             time.sleep(self.UPDATE_DELAY)
 
@@ -118,6 +124,11 @@ class info_query_test(controller_test):
         try:
             ps = self._controller.get_protection_sensors()
             self.assertTrue(isinstance(ps, tuple))
+
+            # Read values into a preallocated buffer
+            buffer = array('d', [0.0] * len(ps))
+            self.assertIs(
+                self._controller.get_protection_sensors(out=buffer), buffer)
         except Exception as error:
             self.fail(f'''Unwanted Exception getting
                       protection sensor temperature: {error}''')
@@ -324,6 +335,102 @@ class operation_range_test(controller_test):
         self.assertLessEqual(dmax, max)
         self.assertGreaterEqual(dmin, min)
 
+    def test_cached_operation_range(self):
+        """Test that setting the operation range updates cached validation.
+        """
+
+        # Reconnect with caching enabled
+        self._controller.disconnect()
+        self._controller = instec.MK2000B(self.MODE, self.BAUD, self.PORT,
+                                          cache=True)
+        self._controller.connect()
+
+        # Set operation range to stage range
+        max, min = self._reset_operation_range()
+
+        # Check that max is valid with the cached range
+        self.assertTrue(self._controller.is_in_operation_range(max))
+
+        # Narrow the operation range
+        self._controller.set_operation_range(max - 1, min)
+
+        # Delay for updated info
+        time.sleep(self.UPDATE_DELAY)
+
+        # Check that max is no longer valid
+        self.assertFalse(self._controller.is_in_operation_range(max))
+        self.assertTrue(self._controller.is_in_operation_range(max - 1))
+
+        # Check that the changed range is queried again after refresh
+        self._controller.refresh()
+        self.assertEqual(self._controller.get_operation_range(),
+                         (max - 1, min))
+        self.assertFalse(self._controller.is_in_operation_range(max))
+
+        # Reset operation range
+        self._reset_operation_range()
+
+
+class settle_test(controller_test):
+    def test_wait_until_settled(self):
+        """Test waiting for PV to settle at TSP.
+        """
+
+        # Hold at the current PV so the wait is short
+        self._reset_cooling_heating()
+        self._reset_operation_range()
+        pv = self._controller.get_process_variable()
+        self._controller.hold(pv)
+
+        # Wait with a wide tolerance
+        stats = self._controller.wait_until_settled(pv, 1, 1, 60)
+        self.assertTrue(isinstance(stats, instec.SettleStats))
+        self.assertGreaterEqual(stats.elapsed, 1)
+        self.assertLessEqual(stats.time_to_band, stats.elapsed)
+        self.assertLessEqual(stats.max_deviation, 1)
+        self.assertAlmostEqual(stats.pv, pv, None, 'Not close enough', 1)
+
+        # Check timeout for a TSP that cannot be reached
+        with self.assertRaises(TimeoutError):
+            self._controller.wait_until_settled(pv + 1000, timeout=0.5)
+
+        # Check invalid parameters
+        with self.assertRaises(ValueError):
+            self._controller.wait_until_settled(pv, -1)
+
+        # Stop the HOLD command
+        self._controller.stop()
+
+    def test_wait_all_settled(self):
+        """Test waiting for PV of many controllers to settle at TSP.
+        """
+
+        # Hold at the current PV so the wait is short
+        self._reset_cooling_heating()
+        self._reset_operation_range()
+        pv = self._controller.get_process_variable()
+        self._controller.hold(pv)
+
+        # Wait with a wide tolerance
+        stats = instec.wait_all_settled([self._controller], 1, 60)
+        self.assertEqual(len(stats), 1)
+        self.assertTrue(isinstance(stats[0], instec.SettleStats))
+        self.assertLessEqual(stats[0].max_deviation, 1)
+
+        # Check that controllers which do not settle are reported as None
+        stats = instec.wait_all_settled([self._controller], [0.1], 0.5,
+                                        [pv + 1000])
+        self.assertEqual(stats, [None])
+
+        # Check invalid parameters
+        with self.assertRaises(ValueError):
+            instec.wait_all_settled([self._controller], [1, 1])
+        with self.assertRaises(ValueError):
+            instec.wait_all_settled([self._controller], -1)
+
+        # Stop the HOLD command
+        self._controller.stop()
+
 
 if __name__ == '__main__':
     unittest.main()